@@ -0,0 +1,67 @@
+import time
+
+import z3
+
+
+class Anytime:  # Senkt mit einem Solver die Schranke für die Summe, bis das Optimum bewiesen oder die Zeit um ist
+    """
+    >>> x, y = z3.Ints('x y')
+    >>> search = Anytime([x >= 3, y >= x + 2, x + y <= 100], [x, y])
+    >>> search.run(5), search.best, search.lower
+    ('optimal', 8, 8)
+    >>> Anytime([x > 0, x < 0], [x]).run(5)
+    'infeasible'
+    >>> search = Anytime([x >= 3, y >= x + 2], [x, y])
+    >>> search.run(0), search.model
+    ('unknown', None)
+    """
+
+    def __init__(self, assertions, terms, solver=None):
+        self.solver = z3.Solver() if solver is None else solver
+        self.solver.add(assertions)
+        self.total = z3.Sum(terms)
+        self.status = 'unknown'
+        self.model = None  # beste bisher gefundene Belegung
+        self.best = None  # ihre Summe
+        self.lower = None  # bewiesene untere Schranke für die Summe
+
+    def __repr__(self):
+        return f'Anytime({self.status}, best={self.best}, lower={self.lower})'
+
+    def _check(self, end):
+        remaining = int((end - time.monotonic()) * 1000)
+        if remaining <= 0:
+            return z3.unknown
+        self.solver.set(timeout=remaining)
+        return self.solver.check()
+
+    def _accept(self):
+        self.model = self.solver.model()
+        self.best = self.model.evaluate(self.total, model_completion=True).as_long()
+
+    def run(self, seconds, lower=None):  # lower: bereits bekannte untere Schranke, z.B. aus dem Presolve
+        end = time.monotonic() + seconds
+        self.lower = lower
+        result = self._check(end)
+        if result != z3.sat:
+            self.status = 'infeasible' if result == z3.unsat else 'unknown'
+            return self.status
+        self._accept()
+        self.status = 'feasible'
+        step = 1
+        while self.lower is None or self.lower < self.best:
+            # Ohne untere Schranke wird mit wachsender Schrittweite nach unten getastet, sonst halbiert
+            target = self.best - step if self.lower is None else (self.lower + self.best - 1) // 2
+            self.solver.push()
+            self.solver.add(self.total <= target)
+            result = self._check(end)
+            if result == z3.sat:
+                self._accept()
+                step *= 2
+            self.solver.pop()
+            if result == z3.unsat:
+                self.lower = target + 1
+            elif result == z3.unknown:
+                return self.status
+        self.status = 'optimal'
+        return self.status
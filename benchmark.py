@@ -0,0 +1,120 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+
+import z3
+
+import main
+import myparser
+
+FAMILIES = {  # Bedingungsfamilien für synthetische Spezifikationen, Schranken sind immer dabei
+    'bounds': ["A[i][j] >= -5;", "A[i][j] <= {limit};"],
+    'neighbours': ["A[i][j] < A[i+1][j];", "A[i][j] <= A[i][j+1] + 2;"],
+    'symmetry': ["A[i][j] = A[j][i];"],
+    'offsets': ["A[i][i+k] < A[i][i+k+1];"],
+    'squares': ["(A[i][j] - A[i+1][j])*(A[i][j] - A[i+1][j]) >= 1;"],
+    'allpairs': ["A[1][i] < A[2][j];"],
+    'columns': ["A[1][j] + A[2][j] > 1;", "A[i][j] < A[i+1][j];"],  # linear, aber kein Differenzsystem
+}
+SIZES = [(5, 5), (10, 10), (20, 20)]
+PHASES = ['parse', 'ground', 'presolve', 'solve', 'extract']
+
+
+def generate(m, n, families):  # Text einer synthetischen Spezifikation
+    """
+    >>> print(generate(2, 3, ['symmetry']))
+    2, 3;
+    A[i][j] >= -5;
+    A[i][j] <= 250;
+    A[i][j] = A[j][i];
+    """
+    lines = [f'{m}, {n};']
+    for family in ['bounds'] + [family for family in families if family != 'bounds']:
+        lines.extend(line.format(limit=10 * (m + n) ** 2) for line in FAMILIES[family])
+    return '\n'.join(lines)
+
+
+def measure(m, n, families, repeat=3):  # Beste Zeit pro Phase über mehrere Läufe
+    """
+    >>> record = measure(3, 3, ['neighbours'], repeat=1)
+    >>> record['size'], record['families'], record['sum'], sorted(record['seconds']) == sorted(PHASES)
+    ('3x3', ['neighbours'], -36, True)
+    """
+    text = generate(m, n, families)
+    best = {phase: float('inf') for phase in PHASES}
+    for _ in range(repeat):
+        timings = {}
+        start = time.perf_counter()
+        spec = myparser.parse_spec(text)
+        timings['parse'] = time.perf_counter() - start
+        start = time.perf_counter()
+        grounded = main.ground_spec(spec)
+        timings['ground'] = time.perf_counter() - start
+        with contextlib.redirect_stdout(io.StringIO()):
+            solution = main.solve_spec(spec, timings=timings, grounded=grounded)
+        for phase in PHASES:
+            best[phase] = min(best[phase], timings.get(phase, 0.0))
+    return {'size': f'{m}x{n}', 'families': list(families), 'constraints': len(grounded[0]),
+            'sum': sum(map(sum, solution)) if solution else None, 'seconds': best}
+
+
+def compare(results, baseline, threshold=1.5, slack=0.01):  # Phasen, die um mehr als den Faktor threshold langsamer wurden
+    """
+    >>> old = {'results': [{'size': '5x5', 'families': ['bounds'], 'seconds': {'solve': 0.2, 'parse': 0.001}}]}
+    >>> new = {'results': [{'size': '5x5', 'families': ['bounds'], 'seconds': {'solve': 0.5, 'parse': 0.004}}]}
+    >>> compare(new, old)
+    [('5x5', 'bounds', 'solve', 0.2, 0.5)]
+    """
+    # Kleine absolute Unterschiede (slack Sekunden) sind Messrauschen und zählen nicht
+    reference = {(record['size'], '+'.join(record['families'])): record['seconds'] for record in baseline['results']}
+    regressions = []
+    for record in results['results']:
+        case = (record['size'], '+'.join(record['families']))
+        for phase, seconds in record['seconds'].items():
+            before = reference.get(case, {}).get(phase)
+            if before is not None and seconds > before * threshold and seconds - before > slack:
+                regressions.append(case + (phase, before, seconds))
+    return regressions
+
+
+def run(sizes=SIZES, families=None, repeat=3):
+    cases = [[family] for family in FAMILIES if family != 'bounds'] if families is None else [families]
+    results = []
+    for m, n in sizes:
+        for case in cases:
+            record = measure(m, n, case, repeat)
+            print(f"{record['size']:>7} {'+'.join(case):<20}" +
+                  ''.join(f' {phase} {record["seconds"][phase]:.4f}' for phase in PHASES), file=sys.stderr)
+            results.append(record)
+    return {'python': platform.python_version(), 'z3': z3.get_version_string(), 'results': results}
+
+
+def command_line(argv=None):
+    parser = argparse.ArgumentParser(description='Laufzeiten von Parser, Grounding und Solver auf synthetischen Tabellen')
+    parser.add_argument('--sizes', default=','.join(f'{m}x{n}' for m, n in SIZES), help='z.B. 5x5,10x20')
+    parser.add_argument('--families', help=f'mit + verbunden aus {", ".join(FAMILIES)}, sonst jede Familie einzeln')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline', help='gespeicherte Ergebnisse, mit denen verglichen wird')
+    parser.add_argument('--threshold', type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    sizes = [tuple(int(x) for x in size.split('x')) for size in args.sizes.split(',')]
+    results = run(sizes, args.families.split('+') if args.families else None, args.repeat)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for size, families, phase, before, after in regressions:
+            print(f'Regression {size} {families} {phase}: {before:.4f}s -> {after:.4f}s', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(command_line())
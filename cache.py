@@ -0,0 +1,144 @@
+import hashlib
+import os
+import pickle
+import zlib
+from collections import OrderedDict
+
+from myparser import tokenize
+
+# Gehört zum Schlüssel jedes Eintrags: bei jeder Änderung am Grounding oder an gepickelten Klassen erhöhen,
+# damit alte Einträge nicht mehr getroffen werden
+FORMAT = 2
+
+
+def spec_key(text):  # Hash des normalisierten Spezifikationstextes, Leerzeichen zwischen Tokens spielen keine Rolle
+    """
+    >>> spec_key("2, 3 ;\\nA[i][j] > 0 ;") == spec_key("2, 3;\\n\\n  A[i][j]   > 0 ;  ")
+    True
+    """
+    lines = (' '.join(str(value) for _, value, _ in tokenize(line)) for line in text.splitlines())
+    return hashlib.sha256('\n'.join([f'format {FORMAT}'] + [line for line in lines if line]).encode()).hexdigest()
+
+
+class SpecCache:  # Verzeichnis mit komprimierten Pickles (z.B. geparste und gegroundete Spezifikationen), LRU nach Größe
+    """
+    >>> import tempfile
+    >>> cache = SpecCache(tempfile.mkdtemp(), max_bytes=10000)
+    >>> cache.get('abc') is None
+    True
+    >>> cache.put('abc', ('spec', [1, 2, 3]))
+    >>> cache.get('abc')
+    ('spec', [1, 2, 3])
+    >>> with open(cache._path('old'), 'wb') as file:  # Pickle einer Klasse, die es nicht mehr gibt
+    ...     _ = file.write(zlib.compress(b'ccache\\nNoSuchClass\\n.'))
+    >>> cache.get('old') is None
+    True
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return f'SpecCache({self.directory!r}, max_bytes={self.max_bytes})'
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.bin')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                entry = pickle.loads(zlib.decompress(file.read()))
+        except Exception:
+            # Auch ein veraltetes Klassenlayout (AttributeError, TypeError, ...) ist nur ein Fehlschlag
+            return None
+        # Der Zugriff frischt die Datei für die LRU-Verdrängung auf
+        os.utime(path)
+        return entry
+
+    def put(self, key, entry):
+        data = zlib.compress(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+        path = self._path(key)
+        # Erst vollständig schreiben, dann umbenennen, damit parallele Leser nie eine halbe Datei sehen
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.bin'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        # Die am längsten nicht benutzten Einträge fliegen zuerst raus
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+
+def problem_key(m, n, store):  # Kanonische Form eines gegroundeten Problems: Dimensionen und sortierte Bedingungen
+    """
+    >>> from grounding import ConstraintStore, Poly
+    >>> x, y = Poly.var('A_1_1'), Poly.var('A_1_2')
+    >>> first, second = ConstraintStore(), ConstraintStore()
+    >>> for constraint in (x > -5, x == y):
+    ...     _ = first.add(constraint)
+    >>> for constraint in (y == x, x >= -4, x + 0 >= -4):
+    ...     _ = second.add(constraint)
+    >>> problem_key(1, 2, first) == problem_key(1, 2, second)
+    True
+    """
+    constraints = sorted(constraint.key for constraint in store)
+    return hashlib.sha256(repr((m, n, store.infeasible, constraints)).encode()).hexdigest()
+
+
+class SolutionCache:  # Optimale Tabellen je kanonischem Problem, LRU im Speicher und optional auf der Platte
+    """
+    >>> solutions = SolutionCache(maxsize=2)
+    >>> for key in ('a', 'b', 'c'):
+    ...     solutions.put(key, [[len(key)]])
+    >>> solutions.get('a'), solutions.get('c')
+    (None, [[1]])
+    >>> table = [[1, 2]]
+    >>> solutions.put('d', table)
+    >>> table[0][0] = 999
+    >>> solutions.get('d')
+    [[1, 2]]
+    """
+
+    def __init__(self, maxsize=1024, directory=None, max_bytes=64 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+        self.disk = SpecCache(directory, max_bytes) if directory else None
+
+    def __repr__(self):
+        return f'SolutionCache(maxsize={self.maxsize}, disk={self.disk})'
+
+    def get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        solution = self.disk.get(key) if self.disk else None
+        if solution is not None:
+            self._remember(key, solution)
+        return solution
+
+    def put(self, key, solution):
+        # Eine eigene Kopie, der Aufrufer darf seine Tabelle danach weiter verändern
+        solution = [row[:] for row in solution]
+        self._remember(key, solution)
+        if self.disk:
+            self.disk.put(key, solution)
+
+    def _remember(self, key, solution):
+        self.memory[key] = solution
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
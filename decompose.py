@@ -0,0 +1,118 @@
+from concurrent.futures import ThreadPoolExecutor
+from math import inf
+
+import z3
+
+
+class UnionFind:  # Disjunkte Mengen über 0..size-1 mit Pfadhalbierung und Vereinigung nach Größe
+    """
+    >>> sets = UnionFind(5)
+    >>> sets.union(0, 1), sets.union(3, 4), sets.union(1, 0)
+    (True, True, False)
+    >>> sets.find(1) == sets.find(0), sets.find(2) == sets.find(3)
+    (True, False)
+    """
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def __repr__(self):
+        return f'UnionFind({len(self.parent)})'
+
+    def find(self, k):
+        parent = self.parent
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return True
+
+
+def components(presolved):  # Zerlegt ein Presolve-Ergebnis in unabhängige Teilprobleme (Variablenindizes, Bedingungen)
+    """
+    >>> from grounding import ConstraintStore, Grid, Poly
+    >>> from presolve import Presolve
+    >>> grid = Grid(2, 3, Poly.var)
+    >>> store = ConstraintStore()
+    >>> for i in (1, 2):
+    ...     for j in (1, 2):
+    ...         _ = store.add(grid.cell(i, j) < grid.cell(i, j + 1))
+    >>> presolved = Presolve(store, grid.names)
+    >>> [[presolved.names[k] for k in group] for group, _ in components(presolved)]
+    [['A_1_1', 'A_1_2', 'A_1_3'], ['A_2_1', 'A_2_2', 'A_2_3']]
+    """
+    sets = UnionFind(len(presolved.names))
+    for constraint in presolved.constraints:
+        first, *others = (presolved.index[name] for name in constraint.variables())
+        for other in others:
+            sets.union(first, other)
+    groups = {}
+    for k in range(len(presolved.names)):
+        groups.setdefault(sets.find(k), ([], []))[0].append(k)
+    for constraint in presolved.constraints:
+        groups[sets.find(presolved.index[next(iter(constraint.variables()))])][1].append(constraint)
+    return list(groups.values())
+
+
+def _solve(presolved, group, constraints, timeout, weights):
+    # Jedes Teilproblem bekommt einen eigenen z3-Kontext, damit die Threads sich nicht in die Quere kommen
+    context = z3.Context()
+    cells = {presolved.names[k]: z3.Int(presolved.names[k], context) for k in group}
+    opt = z3.Optimize(ctx=context)
+    opt.set(timeout=timeout)
+    for k in group:
+        cell = cells[presolved.names[k]]
+        if presolved.lower[k] != -inf:
+            opt.add(cell >= int(presolved.lower[k]))
+        if presolved.upper[k] != inf:
+            opt.add(cell <= int(presolved.upper[k]))
+    opt.add([constraint.to_z3(cells) for constraint in constraints])
+    opt.minimize(z3.Sum([weights.get(name, 1) * cell for name, cell in cells.items()]))
+    result = opt.check()
+    if result != z3.sat:
+        return 'infeasible' if result == z3.unsat else 'unknown', None
+    model = opt.model()
+    return 'optimal', {name: model.evaluate(cell, model_completion=True).as_long() for name, cell in cells.items()}
+
+
+def solve(presolved, groups=None, workers=None, timeout=120000, weights=None):  # Löst die Komponenten einzeln und parallel, liefert (Status, Werte)
+    # weights: Gewicht jeder Variable in der Zielfunktion, sonst 1
+    """
+    >>> from grounding import ConstraintStore, Grid, Poly
+    >>> from presolve import Presolve
+    >>> grid = Grid(2, 2, Poly.var)
+    >>> store = ConstraintStore()
+    >>> for i in (1, 2):
+    ...     _ = store.add(grid.cell(i, 1) >= 0)
+    ...     _ = store.add(grid.cell(i, 2) >= 0)
+    ...     _ = store.add(grid.cell(i, 1) * grid.cell(i, 2) >= 4 * i * i)
+    >>> solve(Presolve(store, grid.names))
+    ('optimal', {'A_1_1': 2, 'A_1_2': 2, 'A_2_1': 4, 'A_2_2': 4})
+    """
+    values = {}
+    hard = []
+    for group, constraints in components(presolved) if groups is None else groups:
+        # Eine Variable ohne Bedingungen liegt im Optimum auf ihrer unteren Schranke
+        if not constraints and len(group) == 1 and presolved.lower[group[0]] != -inf:
+            values[presolved.names[group[0]]] = int(presolved.lower[group[0]])
+        else:
+            hard.append((group, constraints))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda part: _solve(presolved, *part, timeout, weights or {}), hard))
+    # Ein unlösbarer Teil macht das ganze Problem unlösbar, auch wenn ein anderer Teil nicht fertig wurde
+    for status in ('infeasible', 'unknown'):
+        if any(result[0] == status for result in results):
+            return status, None
+    for _, found in results:
+        values.update(found)
+    return 'optimal', values
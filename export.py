@@ -0,0 +1,200 @@
+import argparse
+import re
+import sys
+
+import z3
+
+import grounding
+import myparser
+from grounding import Constraint, ConstraintStore, Disjunction, Poly
+
+SUFFIXES = ('.smt2', '.lp')
+HEADER = re.compile(r'^[;\\]\s*table\s+(\d+)\s+(\d+)', re.MULTILINE)
+
+
+def to_smt2(m, n, store):  # Gegroundetes Problem als SMT-LIB2 mit Zielfunktion, Kopfzeile ; table m n
+    """
+    >>> grid = grounding.Grid(1, 2, Poly.var)
+    >>> store = ConstraintStore()
+    >>> for constraint in (grid.cell(1, 1) >= -2, (grid.cell(1, 1) - grid.cell(1, 2) >= 1) | (grid.cell(1, 2) >= 3)):
+    ...     _ = store.add(constraint)
+    >>> print(to_smt2(1, 2, store))
+    ; table 1 2
+    (set-logic QF_LIA)
+    (declare-const A_1_1 Int)
+    (declare-const A_1_2 Int)
+    (assert (<= (+ (* (- 1) A_1_1)) 2))
+    (assert (or (<= (+ (* (- 1) A_1_1) A_1_2) (- 1)) (<= (+ (* (- 1) A_1_2)) (- 3))))
+    (minimize (+ A_1_1 A_1_2))
+    (check-sat)
+    (get-model)
+    """
+    grid = grounding.Grid(m, n)
+    # Hilfsvariablen (rewrite.compress) werden mit deklariert, gehören aber nicht zur Zielfunktion
+    cells = dict(zip(grid.names, grid.cells), **{name: z3.Int(name) for name in _auxiliary(grid.names, store)})
+    linear = all(len(mono) == 1 for constraint in store for part in _parts(constraint) for mono, _ in part.terms)
+    lines = [f'; table {m} {n}', f'(set-logic {"QF_LIA" if linear else "QF_NIA"})']
+    lines += [f'(declare-const {name} Int)' for name in cells]
+    lines += [f'(assert {assertion.sexpr()})' for assertion in store.to_z3(cells)]
+    lines += [f'(minimize {z3.Sum(grid.cells).sexpr()})', '(check-sat)', '(get-model)']
+    return '\n'.join(lines)
+
+
+def to_lp(m, n, store):  # Lineares Problem im CPLEX-LP-Format, alle Zellen ganzzahlig und unbeschränkt
+    """
+    >>> grid = grounding.Grid(1, 2, Poly.var)
+    >>> store = ConstraintStore()
+    >>> for constraint in (grid.cell(1, 1) >= -2, grid.cell(1, 1) < grid.cell(1, 2)):
+    ...     _ = store.add(constraint)
+    >>> print(to_lp(1, 2, store))
+    \\ table 1 2
+    Minimize
+     obj: A_1_1 + A_1_2
+    Subject To
+     c1: - A_1_1 <= 2
+     c2: A_1_1 - A_1_2 <= -1
+    Bounds
+     A_1_1 free
+     A_1_2 free
+    General
+     A_1_1 A_1_2
+    End
+    """
+    if store.infeasible:
+        raise ValueError('Das Problem ist bereits beim Grounding unlösbar')
+    names = grounding.Grid(m, n, str).names
+    variables = names + _auxiliary(names, store)
+    rows = []
+    for k, constraint in enumerate(store, 1):
+        if isinstance(constraint, Disjunction) or any(len(mono) != 1 for mono, _ in constraint.terms):
+            raise ValueError(f'Das LP-Format kann {constraint} nicht darstellen')
+        terms = ' '.join(f'{"-" if coef < 0 else "+"} {_coefficient(coef)}{mono[0]}' for mono, coef in constraint.terms)
+        rows.append(f' c{k}: {terms.removeprefix("+ ")} {"=" if constraint.op == "==" else "<="} {-constraint.const}')
+    return '\n'.join([f'\\ table {m} {n}', 'Minimize', ' obj: ' + ' + '.join(names), 'Subject To'] + rows +
+                     ['Bounds'] + [f' {name} free' for name in variables] + ['General', ' ' + ' '.join(variables), 'End'])
+
+
+def _coefficient(coef):
+    return '' if abs(coef) == 1 else f'{abs(coef)} '
+
+
+def _auxiliary(names, store):  # Variablen des Stores, die keine Tabellenzellen sind, in fester Reihenfolge
+    known = set(names)
+    return sorted({name for constraint in store for name in constraint.variables()} - known)
+
+
+def _parts(constraint):
+    return constraint.parts if isinstance(constraint, Disjunction) else (constraint,)
+
+
+def load(filename):  # Liest eine exportierte Datei, liefert (Spec ohne Bedingungen, (store, names)) wie main.ground_spec
+    """
+    >>> import os, tempfile
+    >>> from main import ground_spec
+    >>> spec = myparser.load_spec('tbldsc2.txt')
+    >>> store, names = ground_spec(spec)
+    >>> for suffix, write in (('.smt2', to_smt2), ('.lp', to_lp)):
+    ...     path = os.path.join(tempfile.mkdtemp(), 'tbldsc2' + suffix)
+    ...     with open(path, 'w') as file:
+    ...         _ = file.write(write(2, 3, store))
+    ...     loaded, (again, _) = load(path)
+    ...     print(loaded, sorted(again, key=lambda c: c.key) == sorted(store, key=lambda c: c.key))
+    Spec(Dimension(2, 3), 0 conditions) True
+    Spec(Dimension(2, 3), 0 conditions) True
+    """
+    with open(filename, 'r') as file:
+        text = file.read()
+    header = HEADER.search(text)
+    if not header:
+        raise ValueError(f'{filename}: Kopfzeile "table m n" fehlt')
+    m, n = int(header.group(1)), int(header.group(2))
+    store = ConstraintStore()
+    if filename.endswith('.lp'):
+        for constraint in _read_lp(text):
+            store.add(constraint)
+    else:
+        try:
+            assertions = z3.parse_smt2_string(text)
+        except z3.Z3Exception as error:
+            raise ValueError(f'{filename}: {error}')
+        stack = list(assertions)
+        while stack:
+            assertion = stack.pop()
+            if z3.is_and(assertion):
+                stack.extend(assertion.children())
+            else:
+                store.add(_constraint(assertion))
+    names = grounding.Grid(m, n, str).names
+    return myparser.Spec(myparser.Dimension(m, n), []), (store, names + _auxiliary(names, store))
+
+
+def _read_lp(text):
+    body = text.split('Subject To', 1)[1].split('Bounds', 1)[0]
+    for line in body.splitlines():
+        if ':' not in line:
+            continue
+        tokens = line.split(':', 1)[1].split()
+        op, rhs = tokens[-2], int(tokens[-1])
+        poly, sign, coef = Poly.lift(-rhs), 1, 1
+        for token in tokens[:-2]:
+            if token in '+-':
+                sign = -1 if token == '-' else 1
+            elif token.lstrip('-').isdigit():
+                coef = int(token)
+            else:
+                poly = poly + sign * coef * Poly.var(token)
+                sign, coef = 1, 1
+        yield Constraint.make('==' if op == '=' else op, poly)
+
+
+def _poly(expr):  # z3-Term über Zellen -> Poly
+    if z3.is_int_value(expr):
+        return Poly.lift(expr.as_long())
+    if z3.is_const(expr):
+        return Poly.var(str(expr))
+    args = [_poly(arg) for arg in expr.children()]
+    if z3.is_add(expr):
+        return sum(args, Poly.lift(0))
+    if z3.is_sub(expr):
+        return args[0] - sum(args[1:], Poly.lift(0))
+    if z3.is_mul(expr):
+        product = args[0]
+        for arg in args[1:]:
+            product = product * arg
+        return product
+    if expr.decl().kind() == z3.Z3_OP_UMINUS:
+        return -args[0]
+    raise ValueError(f'Nicht unterstützter Term {expr}')
+
+
+COMPARISONS = {z3.Z3_OP_LE: '<=', z3.Z3_OP_GE: '>=', z3.Z3_OP_LT: '<', z3.Z3_OP_GT: '>', z3.Z3_OP_EQ: '=='}
+
+
+def _constraint(expr):  # z3-Bedingung -> kanonische Grundbedingung
+    if z3.is_true(expr) or z3.is_false(expr):
+        return z3.is_true(expr)
+    if z3.is_or(expr):
+        return Disjunction.make(*(_constraint(child) for child in expr.children()))
+    op = COMPARISONS.get(expr.decl().kind())
+    if op is None:
+        raise ValueError(f'Nicht unterstützte Bedingung {expr}')
+    x, y = expr.children()
+    return Constraint.make(op, _poly(x) - _poly(y))
+
+
+def command_line(argv=None):
+    parser = argparse.ArgumentParser(description='Gegroundete Probleme als SMT-LIB2 oder LP exportieren')
+    parser.add_argument('spec')
+    parser.add_argument('output', help='Endung .smt2 oder .lp')
+    args = parser.parse_args(argv)
+    from main import ground_spec  # main importiert dieses Modul selbst
+    spec = myparser.load_spec(args.spec)
+    store, _ = ground_spec(spec)
+    write = to_lp if args.output.endswith('.lp') else to_smt2
+    with open(args.output, 'w') as file:
+        file.write(write(spec.dimension.first, spec.dimension.second, store))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(command_line())
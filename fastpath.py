@@ -0,0 +1,68 @@
+from collections import deque
+from math import inf
+
+from grounding import Disjunction
+
+
+def least_solution(presolved):  # Kleinste Lösung eines Differenzsystems, sie minimiert auch die Summe aller Zellen
+    """
+    >>> from grounding import ConstraintStore, Poly
+    >>> from presolve import Presolve
+    >>> a, b, c = Poly.var('a'), Poly.var('b'), Poly.var('c')
+    >>> store = ConstraintStore()
+    >>> for constraint in (a > -5, a < b, b <= c - 2, c <= 10):
+    ...     _ = store.add(constraint)
+    >>> least_solution(Presolve(store, ['a', 'b', 'c'], budget=0))
+    ('optimal', {'a': -4, 'b': -3, 'c': -1})
+    >>> store = ConstraintStore()
+    >>> for constraint in (a >= 0, b >= 0, a < b, b < a):
+    ...     _ = store.add(constraint)
+    >>> least_solution(Presolve(store, ['a', 'b'], budget=0))
+    ('infeasible', None)
+    >>> x = [Poly.var(f'x{k}') for k in range(8)]
+    >>> store = ConstraintStore()
+    >>> for u, v, w in ((0, 1, 1), (0, 1, 4), (1, 2, 2), (1, 3, 1), (1, 3, 3), (1, 4, 4), (1, 7, 6), (2, 3, 4), (2, 5, 4),
+    ...                 (3, 4, 5), (3, 5, 4), (4, 6, 6), (5, 6, 5), (6, 7, 3), (6, 7, 4)):
+    ...     _ = store.add(x[u] >= 0)
+    ...     _ = store.add(x[v] - x[u] >= w)
+    >>> least_solution(Presolve(store, [f'x{k}' for k in range(8)], budget=0))[1]['x7']
+    25
+    """
+    if presolved.infeasible:
+        return 'infeasible', None
+    lower = list(presolved.lower)
+    edges = [[] for _ in presolved.names]  # Kante u -> v mit Gewicht w heißt x_v >= x_u + w
+    for constraint in presolved.constraints:
+        if isinstance(constraint, Disjunction):
+            return 'unknown', None
+        terms = constraint.terms
+        if len(terms) != 2 or any(len(mono) != 1 for mono, _ in terms) or {coef for _, coef in terms} != {1, -1}:
+            return 'unknown', None
+        (u,), (v,) = (mono for mono, coef in sorted(terms, key=lambda term: -term[1]))
+        u, v = presolved.index[u], presolved.index[v]
+        # x_u - x_v + c <= 0  =>  x_v >= x_u + c
+        edges[u].append((v, constraint.const))
+        if constraint.op == '==':
+            edges[v].append((u, -constraint.const))
+
+    # Längste Wege von den unteren Schranken aus (Bellman-Ford mit Arbeitsliste)
+    queue = deque(k for k in range(len(lower)) if lower[k] != -inf)
+    queued = set(queue)
+    length = [0] * len(lower)  # Kanten des Weges, der die aktuelle Schranke liefert
+    while queue:
+        u = queue.popleft()
+        queued.discard(u)
+        for v, weight in edges[u]:
+            if lower[u] + weight > lower[v]:
+                lower[v] = lower[u] + weight
+                length[v] = length[u] + 1
+                # Ein Weg mit len(lower) Kanten besucht eine Variable zweimal, echt verbessert geht das nur über
+                # einen Kreis mit positivem Gewicht, der die Schranken unbegrenzt anhebt
+                if lower[v] > presolved.upper[v] or length[v] >= len(lower):
+                    return 'infeasible', None
+                if v not in queued:
+                    queued.add(v)
+                    queue.append(v)
+    if any(value == -inf for value in lower):
+        return 'unknown', None  # Die Summe ist nach unten unbeschränkt, das entscheidet z3
+    return 'optimal', {name: int(value) for name, value in zip(presolved.names, lower)}
@@ -0,0 +1,389 @@
+from math import gcd
+
+import z3
+
+from myparser import Con, Matrix, Times
+
+
+class Grid:  # Flache Tabelle mit einer z3-Int-Variable pro Zelle, Indizes wie in der Aufgabenstellung ab 1
+    """
+    >>> grid = Grid(2, 3)
+    >>> grid.cell(2, 3)
+    A_2_3
+    >>> grid.rows()
+    [[A_1_1, A_1_2, A_1_3], [A_2_1, A_2_2, A_2_3]]
+    >>> grid.cell(3, 1)
+    Traceback (most recent call last):
+    ...
+    IndexError: A[3][1] liegt außerhalb der 2x3-Tabelle
+    """
+
+    def __init__(self, m, n, make=z3.Int):
+        self.m = m
+        self.n = n
+        # Zeilenweise in einer Liste abgelegt, Zelle (i, j) liegt an Position (i - 1) * n + (j - 1)
+        self.names = [f'A_{i}_{j}' for i in range(1, m + 1) for j in range(1, n + 1)]
+        self.cells = [make(name) for name in self.names]
+
+    def __repr__(self):
+        return f'Grid({self.m}, {self.n})'
+
+    def cell(self, i, j):
+        if not (1 <= i <= self.m and 1 <= j <= self.n):
+            raise IndexError(f'A[{i}][{j}] liegt außerhalb der {self.m}x{self.n}-Tabelle')
+        return self.cells[(i - 1) * self.n + (j - 1)]
+
+    def rows(self):
+        return [self.cells[i * self.n:(i + 1) * self.n] for i in range(self.m)]
+
+
+class Poly:  # Ganzzahliges Polynom über Zellvariablen, Monome sind sortierte Tupel von Variablennamen
+    """
+    >>> x, y = Poly.var('A_1_1'), Poly.var('A_2_1')
+    >>> (x - y) * (x - y)
+    Poly(A_1_1*A_1_1 - 2*A_1_1*A_2_1 + A_2_1*A_2_1)
+    >>> 3 - x + x
+    Poly(3)
+    """
+    __slots__ = ('terms',)
+    __hash__ = None
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    @staticmethod
+    def var(name):
+        return Poly({(name,): 1})
+
+    @staticmethod
+    def lift(x):
+        return x if isinstance(x, Poly) else Poly({(): x} if x else {})
+
+    def __repr__(self):
+        return f'Poly({_format(sorted(self.terms.items()))})'
+
+    def __add__(self, other):
+        terms = dict(self.terms)
+        for mono, coef in Poly.lift(other).terms.items():
+            coef += terms.get(mono, 0)
+            if coef:
+                terms[mono] = coef
+            else:
+                terms.pop(mono, None)
+        return Poly(terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Poly({mono: -coef for mono, coef in self.terms.items()})
+
+    def __sub__(self, other):
+        return self + -Poly.lift(other)
+
+    def __rsub__(self, other):
+        return Poly.lift(other) + -self
+
+    def __mul__(self, other):
+        terms = {}
+        for mono1, coef1 in self.terms.items():
+            for mono2, coef2 in Poly.lift(other).terms.items():
+                mono = tuple(sorted(mono1 + mono2))
+                terms[mono] = terms.get(mono, 0) + coef1 * coef2
+        return Poly({mono: coef for mono, coef in terms.items() if coef})
+
+    __rmul__ = __mul__
+
+    # Vergleiche liefern wie bei z3 keine Wahrheitswerte, sondern normalisierte Bedingungen
+    def __lt__(self, other):
+        return Constraint.make('<', self - other)
+
+    def __le__(self, other):
+        return Constraint.make('<=', self - other)
+
+    def __gt__(self, other):
+        return Constraint.make('>', self - other)
+
+    def __ge__(self, other):
+        return Constraint.make('>=', self - other)
+
+    def __eq__(self, other):
+        return Constraint.make('==', self - other)
+
+
+def _format(terms):
+    text = ''
+    for mono, coef in terms:
+        factor = '*'.join(mono)
+        if not mono:
+            factor, coef = str(abs(coef)), coef // abs(coef)
+        elif abs(coef) != 1:
+            factor = f'{abs(coef)}*{factor}'
+        if not text:
+            text = factor if coef > 0 else f'-{factor}'
+        else:
+            text += f' + {factor}' if coef > 0 else f' - {factor}'
+    return text or '0'
+
+
+class Constraint:  # Kanonische Grundbedingung: Summe der Terme + const <= 0 bzw. == 0
+    """
+    >>> x, y = Poly.var('A_1_2'), Poly.var('A_2_1')
+    >>> x == y, y == x, x > y, y < x
+    (A_1_2 - A_2_1 == 0, A_1_2 - A_2_1 == 0, -A_1_2 + A_2_1 <= -1, -A_1_2 + A_2_1 <= -1)
+    >>> x > -5, x >= -4, 2 * x <= 5
+    (-A_1_2 <= 4, -A_1_2 <= 4, A_1_2 <= 2)
+    >>> x - x == 0, x - x > 0
+    (True, False)
+    """
+    __slots__ = ('op', 'terms', 'const', 'key')
+
+    def __init__(self, op, terms, const):
+        self.op = op
+        self.terms = terms
+        self.const = const
+        self.key = (op, terms, const)
+
+    def __repr__(self):
+        return f'{_format(self.terms)} {self.op} {-self.const}'
+
+    def __eq__(self, other):
+        return isinstance(other, Constraint) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    @staticmethod
+    def make(op, poly):  # Normalisiert "poly op 0", triviale Bedingungen werden zu True oder False
+        # Über den ganzen Zahlen: p < 0 <=> p + 1 <= 0, p >= 0 <=> -p <= 0, p > 0 <=> -p + 1 <= 0
+        if op in ('>', '>='):
+            poly, op = -poly, '<' if op == '>' else '<='
+        const = poly.terms.get((), 0) + (1 if op == '<' else 0)
+        op = '==' if op == '==' else '<='
+        terms = sorted((mono, coef) for mono, coef in poly.terms.items() if mono)
+        if not terms:
+            return const == 0 if op == '==' else const <= 0
+        divisor = 0
+        for _, coef in terms:
+            divisor = gcd(divisor, coef)
+        if op == '==':
+            if const % divisor:
+                return False
+            # Gleichungen werden so gedreht, dass der erste Term positiv ist
+            if terms[0][1] < 0:
+                divisor = -divisor
+            const //= divisor
+        else:
+            const = -(-const // divisor)
+        return Constraint(op, tuple((mono, coef // divisor) for mono, coef in terms), const)
+
+    def variables(self):
+        return {name for mono, _ in self.terms for name in mono}
+
+    def to_z3(self, cells):  # cells bildet Variablennamen auf z3-Ausdrücke ab
+        total = z3.Sum([_product([cells[name] for name in mono], coef) for mono, coef in self.terms])
+        return total == -self.const if self.op == '==' else total <= -self.const
+
+    def __or__(self, other):
+        return Disjunction.make(self, other)
+
+    __ror__ = __or__
+
+
+class Disjunction:  # Oder-Verknüpfung kanonischer Grundbedingungen, Teile sortiert und ohne Duplikate
+    """
+    >>> x, y = Poly.var('A_1_1'), Poly.var('A_2_1')
+    >>> (x - y >= 1) | (y - x >= 1)
+    -A_1_1 + A_2_1 <= -1 or A_1_1 - A_2_1 <= -1
+    >>> ((x >= 1) | (x >= 1), (x >= 1) | (x - x == 0), (x >= 1) | (x - x > 0))
+    (-A_1_1 <= -1, True, -A_1_1 <= -1)
+    """
+    __slots__ = ('parts', 'key')
+    op = 'or'
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.key = ('or', tuple(part.key for part in parts), 0)
+
+    def __repr__(self):
+        return ' or '.join(repr(part) for part in self.parts)
+
+    def __eq__(self, other):
+        return isinstance(other, Disjunction) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    @staticmethod
+    def make(*parts):  # Wie Constraint.make: ein wahrer Teil macht alles wahr, falsche Teile fallen weg
+        found = {}
+        for part in parts:
+            if part is True:
+                return True
+            if part is not False:
+                for inner in part.parts if isinstance(part, Disjunction) else (part,):
+                    found[inner.key] = inner
+        if len(found) <= 1:
+            return next(iter(found.values()), False)
+        return Disjunction(tuple(found[key] for key in sorted(found)))
+
+    def variables(self):
+        return set().union(*(part.variables() for part in self.parts))
+
+    def to_z3(self, cells):
+        return z3.Or([part.to_z3(cells) for part in self.parts])
+
+    def __or__(self, other):
+        return Disjunction.make(self, other)
+
+    __ror__ = __or__
+
+
+def _product(factors, coef=1):
+    product = factors[0] if coef == 1 else coef * factors[0]
+    for factor in factors[1:]:
+        product = product * factor
+    return product
+
+
+class ConstraintStore:  # Sammelt Grundbedingungen ohne Duplikate und Tautologien, gleiche Bedingungen sind dasselbe Objekt
+    """
+    >>> grid = Grid(2, 2, Poly.var)
+    >>> store = ConstraintStore()
+    >>> for i in (1, 2):
+    ...     for j in (1, 2):
+    ...         _ = store.add(grid.cell(i, j) == grid.cell(j, i))
+    >>> list(store), store.added, store.duplicates, store.tautologies
+    ([A_1_2 - A_2_1 == 0], 4, 1, 2)
+    """
+
+    def __init__(self):
+        self.constraints = {}
+        self.infeasible = False
+        self.added = 0
+        self.duplicates = 0
+        self.tautologies = 0
+
+    def __iter__(self):
+        return iter(self.constraints)
+
+    def __len__(self):
+        return len(self.constraints)
+
+    def add(self, constraint):
+        self.added += 1
+        if constraint is True:
+            self.tautologies += 1
+            return constraint
+        if constraint is False:
+            self.infeasible = True
+            return constraint
+        if constraint in self.constraints:
+            self.duplicates += 1
+            return self.constraints[constraint]
+        self.constraints[constraint] = constraint
+        return constraint
+
+    def to_z3(self, cells):
+        if self.infeasible:
+            return [z3.BoolVal(False)]
+        return [constraint.to_z3(cells) for constraint in self.constraints]
+
+
+def children(node):  # Direkte Unterausdrücke eines AST-Knotens
+    return [getattr(node, name) for name in ('x', 'y') if hasattr(node, name)]
+
+
+def variables(*nodes):  # Namen aller freien Indexvariablen in den gegebenen ASTs
+    """
+    >>> from myparser import CompiledCondition
+    >>> sorted(variables(CompiledCondition.parse("A[i][i+k] < A[i][i+k+1];")[0][0]))
+    ['i', 'k']
+    """
+    found = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if hasattr(node, 'var'):
+            found.add(node.var)
+        stack.extend(children(node))
+    return found
+
+
+def references(node):  # Alle Tabellenreferenzen A[x][y] eines AST
+    found = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Matrix):
+            found.append(node)
+        else:
+            stack.extend(children(node))
+    return found
+
+
+def _monotone(expr, in_product=False):
+    # Mit Variablen >= 1 ist ein Indexausdruck monoton wachsend, solange in Produkten keine negativen Konstanten stehen
+    if isinstance(expr, Con):
+        return not in_product or expr.con >= 0
+    if isinstance(expr, Times):
+        return _monotone(expr.x, True) and _monotone(expr.y, True)
+    return all(_monotone(child, in_product) for child in children(expr))
+
+
+def bindings(condition, m, n):  # Genau die Belegungen der freien Variablen, bei denen alle Referenzen in der Tabelle liegen
+    """
+    >>> from myparser import CompiledCondition
+    >>> parse = lambda line: CompiledCondition.parse(line)[0][0]
+    >>> [(env['i'], env['k']) for env in bindings(parse("A[i][i+k] >= 10;"), 2, 4)]
+    [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2)]
+    >>> [(env['i'], env['j']) for env in bindings(parse("A[i][j] = A[j][i];"), 2, 4)]
+    [(1, 1), (1, 2), (2, 1), (2, 2)]
+    >>> len(list(bindings(parse("A[1][i] < A[2][j];"), 2, 4)))
+    16
+    >>> list(bindings(parse("A[2][2] = 3;"), 3, 3)), list(bindings(parse("A[4][1] = 3;"), 3, 3))
+    ([{}], [])
+    """
+    names, indices, limits = domains(condition, m, n)
+
+    # Prüfungen nach der Variable ordnen, ab der alle ihre Variablen belegt sind
+    checks = [[] for _ in range(len(names) + 1)]
+    for _, index, used, limit in indices:
+        depth = max((names.index(name) + 1 for name in used), default=0)
+        checks[depth].append((index, limit))
+
+    env = {}
+
+    def extend(depth):
+        if any(not 1 <= index(None, env) <= limit for index, limit in checks[depth]):
+            return
+        if depth == len(names):
+            yield dict(env)
+            return
+        for value in range(1, limits[names[depth]] + 1):
+            env[names[depth]] = value
+            yield from extend(depth + 1)
+        env.pop(names[depth], None)
+
+    yield from extend(0)
+
+
+def domains(condition, m, n):  # (sortierte Variablennamen, Indexausdrücke mit Grenze, Obergrenze jeder Variable)
+    names = sorted(variables(condition))
+    # Jeder Zeilenindex muss in 1..m liegen, jeder Spaltenindex in 1..n
+    indices = [(expr, expr.compile(), sorted(variables(expr)), limit)
+               for ref in references(condition) for expr, limit in ((ref.x, m), (ref.y, n))]
+
+    # Obergrenze jeder Variable: aus e >= v + e(1, ..., 1) - 1 für monotone Indexausdrücke e, in denen v wirkt
+    limits = {}
+    for expr, index, used, limit in indices:
+        if not _monotone(expr):
+            continue
+        ones = {name: 1 for name in used}
+        base = index(None, ones)
+        for name in used:
+            if index(None, dict(ones, **{name: 2})) > base:
+                limits[name] = min(limits.get(name, limit - base + 1), limit - base + 1)
+    unbounded = [name for name in names if name not in limits]
+    if unbounded:
+        raise ValueError(f'Der Wertebereich von {", ".join(unbounded)} wird durch keinen Tabellenindex begrenzt')
+    return names, indices, limits
@@ -0,0 +1,67 @@
+import vectorized
+from myparser import Bigger, BiggerEqual, Equal, Or, Smaller, SmallerEqual
+
+np = vectorized.np
+
+
+class Template:  # Breite Bedingung, deren Instanzen erst gegroundet werden, wenn eine Lösung sie verletzt
+    """
+    >>> from grounding import Grid
+    >>> from myparser import CompiledCondition
+    >>> template = Template(CompiledCondition.parse("A[1][i] < A[2][j];")[0][0], 2, 4, Grid(2, 4, str).names)
+    >>> template, template.wide
+    (Template(16 instances, 0 grounded), True)
+    >>> template.seed(2)
+    [A_1_1 - A_2_1 <= -1, A_1_4 - A_2_4 <= -1]
+    >>> template.cuts([[0, 0, 5, 0], [1, 1, 1, 1]], 3)
+    [A_1_3 - A_2_1 <= -1, A_1_3 - A_2_2 <= -1, A_1_3 - A_2_3 <= -1]
+    >>> template.cuts([[0, 0, 0, 0], [1, 1, 1, 1]], 3), template
+    ([], Template(16 instances, 5 grounded))
+    """
+
+    def __init__(self, condition, m, n, names):
+        self.condition = condition
+        self.names = names
+        self.axes, self.flats, self.count = vectorized.arrays(condition, m, n)
+        # Mehr Instanzen als Zellen: die meisten davon sind im Optimum redundant
+        self.wide = self.count > m * n
+        self.grounded = np.zeros(self.count, dtype=bool)
+
+    def __repr__(self):
+        return f'Template({self.count} instances, {int(self.grounded.sum())} grounded)'
+
+    def instances(self, rows):  # Grundinstanzen der Belegungen rows, die danach als gegroundet gelten
+        self.grounded[rows] = True
+        return vectorized.ground(self.condition, {name: axis[rows] for name, axis in self.axes.items()},
+                                 {key: flat[rows] for key, flat in self.flats.items()}, len(rows), self.names)
+
+    def seed(self, size):  # Gleichmäßig über alle Belegungen verteilte Startinstanzen
+        return self.instances(np.unique(np.linspace(0, self.count - 1, min(size, self.count)).astype(np.int64)))
+
+    def cuts(self, table, limit):  # Bis zu limit am stärksten verletzte Instanzen für die Tabelle table
+        values = np.asarray(table, dtype=np.int64).reshape(-1)
+        excess = _excess(self.condition, self.axes, self.flats, values, self.count)
+        violated = np.flatnonzero(excess > 0)
+        if len(violated) > limit:
+            violated = violated[np.argpartition(-excess[violated], limit - 1)[:limit]]
+        return self.instances(np.sort(violated))
+
+
+def _excess(condition, axes, flats, values, count):  # Wie weit jede Belegung die Bedingung verletzt, <= 0 heißt erfüllt
+    if isinstance(condition, Or):
+        # Eine Disjunktion ist nur verletzt, wenn beide Seiten es sind
+        return np.minimum(_excess(condition.x, axes, flats, values, count),
+                          _excess(condition.y, axes, flats, values, count))
+    x, y = (vectorized.evaluate(side, axes, flats, values) for side in (condition.x, condition.y))
+    difference = np.broadcast_to(x - y, (count,))
+    if isinstance(condition, Smaller):
+        return difference + 1
+    if isinstance(condition, SmallerEqual):
+        return difference
+    if isinstance(condition, Bigger):
+        return 1 - difference
+    if isinstance(condition, BiggerEqual):
+        return -difference
+    if isinstance(condition, Equal):
+        return np.abs(difference)
+    raise ValueError(f'{condition} ist keine Bedingung')
@@ -1,52 +1,437 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import z3
+import anytime
+import decompose
+import export
+import fastpath
+import grounding
+import lazy
 import myparser
-from myparser import AllConditions, StartToParse
+import portfolio
+import presolve
+import reduction
+import rewrite
+import vectorized
+from cache import problem_key, spec_key
+
+try:
+    import resource
+except ImportError:  # nicht unter Windows, dort fehlt der Speicherhöchststand in den Statistiken
+    resource = None
+
+
+def solve(filename, encoding='flat', cache=None, solutions=None, stats=False, deadline=None, strategies=None,
+          lazy_templates=False):  # Mit stats=True wird (Lösung, Statistik) zurückgegeben
+    # Mit lazy_templates=True werden breite Bedingungen wie A[2][j] - A[1][i] >= 1 nur bei Verletzung gegroundet
+    # (nur ohne Cache und mit der flachen Kodierung)
+    """
+    >>> table, record = solve('Test.txt', stats=True)
+    >>> record['conditions'], record['cells'], record['constraints'], record['path'], record['status']
+    (4, 9, 22, 'z3', 'optimal')
+    >>> sorted(record['seconds'])
+    ['extract', 'ground', 'presolve', 'solve']
+    >>> table, record = solve('Test.txt', stats=True, deadline=30)
+    >>> sum(map(sum, table)), record['status'], record['lower_bound']
+    (15, 'optimal', 15)
+    >>> sum(map(sum, solve('Test.txt', strategies=['binary', 'tactic'])))
+    15
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'pairs.txt')
+    >>> with open(path, 'w') as file:
+    ...     _ = file.write('2, 6; A[i][j] >= 0; A[2][j] - A[1][i] >= 1;')
+    >>> table, record = solve(path, stats=True, lazy_templates=True)
+    >>> table == solve(path), record['rounds'], record['deferred']
+    (True, 2, 18)
+    >>> from cache import SpecCache
+    >>> with open(path, 'w') as file:  # x wird von keinem Index beschränkt
+    ...     _ = file.write('2, 2; A[i][j] >= x;')
+    >>> solve(path, cache=SpecCache(tempfile.mkdtemp())) is None
+    Invalid input file!
+    True
+    >>> solve(path, encoding='array') is None
+    Invalid input file!
+    True
+    >>> with open(path, 'w') as file:
+    ...     _ = file.write('0, 3; A[i][j] >= 1;')
+    >>> solve(path, encoding='array'), solve(path, encoding='array', deadline=5)
+    ([], [])
+    """
+    record = {} if stats else None
+    solution = _solve_file(filename, encoding, cache, solutions, record, deadline, strategies, lazy_templates)[1]
+    return (solution, record) if stats else solution
+
+
+def solve_many(paths, workers=None, encoding='flat', cache=None, solutions=None, stats=False, deadline=None,
+               strategies=None, lazy_templates=False):  # Löst viele Dateien parallel, liefert (Pfad, Lösung, Zeiten) sobald fertig
+    # Mit stats=True steht an dritter Stelle statt der Zeiten die vollständige Statistik
+    # Jeder Prozess bekommt eine Kopie von solutions, nur die Ebene auf der Platte wird zwischen den Dateien geteilt
+    """
+    >>> import os, tempfile
+    >>> from cache import SolutionCache
+    >>> directory = tempfile.mkdtemp()
+    >>> paths = [os.path.join(directory, name) for name in ('row.txt', 'column.txt')]
+    >>> for path, text in zip(paths, ('1, 2; A[1][j] >= j;', '2, 1; A[i][1] >= 3;')):
+    ...     with open(path, 'w') as file:
+    ...         _ = file.write(text)
+    >>> sorted((os.path.basename(path), solution) for path, solution, _ in solve_many(paths, workers=2))
+    [('column.txt', [[3], [3]]), ('row.txt', [[1, 2]])]
+    >>> sorted(solution for _, solution, _ in solve_many(paths * 2, workers=1))  # im selben Prozess nacheinander
+    [[[1, 2]], [[1, 2]], [[3], [3]], [[3], [3]]]
+    >>> solve_many(paths, solutions=SolutionCache())
+    Traceback (most recent call last):
+    ...
+    ValueError: solve_many teilt nur einen SolutionCache mit Verzeichnis zwischen den Prozessen
+    """
+    if solutions is not None and solutions.disk is None:
+        raise ValueError('solve_many teilt nur einen SolutionCache mit Verzeichnis zwischen den Prozessen')
+    return _solve_many(paths, workers, encoding, cache, solutions, stats, deadline, strategies, lazy_templates)
 
 
-def solve(filename):
-    StartToParse().start(filename)
+def _solve_many(paths, workers, encoding, cache, solutions, stats, deadline, strategies, lazy_templates):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_solve_file, path, encoding, cache, solutions, {} if stats else None, deadline, strategies,
+                               lazy_templates)
+                   for path in paths]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Bricht der Aufrufer die Schleife ab, werden noch nicht gestartete Dateien verworfen
+            pool.shutdown(cancel_futures=True)
+
+
+def _solve_file(filename, encoding, cache=None, solutions=None, stats=None, deadline=None, strategies=None,
+                lazy_templates=False):
+    timings = {}
+    if stats is not None:
+        stats.update(file=filename, seconds=timings)
+    # Die Frist gilt ab hier, Parsen und Grounding zählen mit
+    end = None if deadline is None else time.monotonic() + deadline
+    try:
+        return (filename,) + _solve_text(filename, encoding, cache, solutions, stats, timings, end, strategies,
+                                         lazy_templates)
+    finally:
+        if stats is not None and resource is not None:
+            # Höchststand des ganzen Prozesses, unter Linux in KiB
+            stats['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _solve_text(filename, encoding, cache, solutions, stats, timings, end, strategies, lazy_templates=False):
+    start = time.perf_counter()
+    if filename.endswith(export.SUFFIXES):
+        # Exportierte Probleme (export.py) sind bereits gegroundet, Parser und Grounding entfallen
+        try:
+            spec, grounded = export.load(filename)
+        except ValueError:
+            print("Invalid input file!")
+            return None, (stats if stats is not None else timings)
+        timings['load'] = time.perf_counter() - start
+        return solve_spec(spec, 'flat', timings, grounded, solutions, stats, _remaining(end), strategies), \
+            (stats if stats is not None else timings)
+    if cache is None and encoding == 'flat':
+        return _solve_stream(filename, timings, solutions, stats, end, strategies, lazy_templates), \
+            (stats if stats is not None else timings)
     with open(filename, 'r') as file:
-        # Auslesen der ersten Zeile der Datei und Leerzeichen entfernen
-        first_line = file.readline().strip()
-        # Dimensionen aus der ersten Zeile parsen
-        dimensions = myparser.ParseDimension().parse(first_line)
-        # Programmabbruch bei ungültiger Dateiformatierung
-        if not dimensions:
+        text = file.read()
+    # Ein Treffer im Cache (cache.SpecCache) überspringt Parser und Grounding vollständig
+    key = spec_key(text) if cache is not None and encoding == 'flat' else None
+    entry = cache.get(key) if key else None
+    if entry is not None:
+        spec, grounded = entry
+        timings['cache'] = time.perf_counter() - start
+    else:
+        try:
+            # Jede Datei wird für sich geparst, es bleibt kein Zustand zwischen zwei Aufrufen zurück
+            spec = myparser.parse_spec(text, filename)
+            timings['parse'] = time.perf_counter() - start
+            grounded = None
+            if key:
+                start = time.perf_counter()
+                # Auch das Grounding kann scheitern, z.B. an einer Variable ohne Indexschranke
+                grounded = ground_spec(spec)
+                cache.put(key, (spec, grounded))
+                timings['ground'] = time.perf_counter() - start
+        except ValueError:
+            # Programmabbruch bei ungültiger Dateiformatierung
             print("Invalid input file!")
-            return
-        # Zur Index-Anpassung vergrößern wir die Dimensionen um 1
-        m, n = dimensions[0][0].first+1, dimensions[0][0].second+1
+            return None, (stats if stats is not None else timings)
+    return solve_spec(spec, encoding, timings, grounded, solutions, stats, _remaining(end), strategies), \
+        (stats if stats is not None else timings)
 
-    # Erstellung eines Arrays mit Z3 zur Repräsentation der Matrizen
-    A = z3.Array('A', z3.IntSort(), z3.ArraySort(z3.IntSort(), z3.IntSort()))
-    # Deklaration und Definition der z3-Variable k
-    k = z3.Int('k')
-    # Verwendung des Z3-Optimizers
-    opt = z3.Optimize()
-    # Erhöhung des Timeouts auf 120 Sekunden für längere Berechnungen der Lösung
-    opt.set(timeout=120000)
 
-    # Hinzufügen der Bedingungen und Umwandlung in Z3
-    for x in range(len(AllConditions)):
-        for i in range(m):
-            for j in range(n):
-                opt.add(eval(AllConditions[x].to_z3()))
-
-    # Minimierung nach Summe aller Elemente der Matrix
-    matrix_sum = z3.Sum([A[i][j] for i in range(m) for j in range(n)])
-    opt.minimize(matrix_sum)
-
-    # Überprüft, ob eine Lösung vorhanden ist
-    if opt.check() == z3.sat:
-        model = opt.model()
+def _remaining(end):
+    return None if end is None else end - time.monotonic()
+
+
+def _solve_stream(filename, timings, solutions, stats=None, end=None, strategies=None, lazy_templates=False):
+    start = time.perf_counter()
+    templates = [] if lazy_templates and vectorized.np is not None else None
+    try:
+        with open(filename, 'r') as file:
+            # Die Bedingungen werden einzeln gelesen, geparst und gegroundet, weder der Text noch die ASTs bleiben liegen
+            dimension, conditions = myparser.read_spec(file, filename)
+            if stats is not None:
+                conditions = _counted(conditions, stats)
+            grounded = _ground_flat(conditions, dimension.first, dimension.second, templates)
+    except ValueError:
+        print("Invalid input file!")
+        return None
+    timings['ground'] = time.perf_counter() - start
+    # Die ASTs werden nach dem Grounding nicht mehr gebraucht
+    return solve_spec(myparser.Spec(dimension, []), 'flat', timings, grounded, solutions, stats, _remaining(end),
+                      strategies, templates)
+
+
+def _counted(conditions, stats):
+    stats['conditions'] = 0
+    for condition in conditions:
+        stats['conditions'] += 1
+        yield condition
+
+
+def ground_spec(spec):  # Kanonische Grundbedingungen und Zellnamen einer Spezifikation
+    return _ground_flat(spec.conditions, spec.dimension.first, spec.dimension.second)
+
+
+def solve_spec(spec, encoding='flat', timings=None, grounded=None, solutions=None, stats=None, deadline=None,
+               strategies=None, templates=None):
+    # Mit deadline (Sekunden) wird statt des Optimizers die beste bis dahin gefundene Tabelle geliefert
+    # strategies (Namen aus portfolio.STRATEGIES) lässt bei der flachen Kodierung mehrere Prozesse gegeneinander antreten
+    # templates (lazy.Template) sind breite Bedingungen, die grounded noch nicht enthält
+    timings = {} if timings is None else timings
+    end = None if deadline is None else time.monotonic() + deadline
+    m, n = spec.dimension.first, spec.dimension.second
+    conditions = spec.conditions
+    # Statistiken werden nur erhoben, wenn ein Dict dafür übergeben wird
+    if stats is not None:
+        stats.setdefault('conditions', len(conditions))
+        stats['cells'] = m * n
+
+    if encoding == 'flat':
+        if grounded is None:
+            start = time.perf_counter()
+            grounded = ground_spec(spec)
+            timings['ground'] = time.perf_counter() - start
+        store, names = grounded
+        if stats is not None:
+            stats.update(constraints=len(store), instances=store.added, duplicates=store.duplicates,
+                         tautologies=store.tautologies, auxiliary=len(names) - m * n)
+        if templates:
+            return _solve_lazy(spec, store, names, templates, timings, solutions, stats, end, strategies)
+        # Gleiche kanonische Probleme (cache.SolutionCache) müssen nicht erneut gelöst werden
+        key = problem_key(m, n, store) if solutions is not None else None
+        solution = solutions.get(key) if key else None
+        if solution is not None:
+            if stats is not None:
+                stats.update(path='cache', status='optimal' if solution else 'infeasible')
+            if not solution:
+                print("No solution found!")
+            return [row[:] for row in solution]
+        start = time.perf_counter()
+        # Gleiche Zellen werden zu einer Unbekannten mit der Klassengröße als Gewicht, festgelegte Zellen zu Konstanten
+        reduced = reduction.Reduction(store, names, names[m * n:])
+        # Schranken werden vor dem Solver gefaltet, Widersprüche fallen hier schon ohne z3 auf
+        presolved = presolve.Presolve(reduced.store, reduced.names)
+        status = 'infeasible' if presolved.infeasible else 'unknown'
+        # Der Weg wird nur vermerkt, wenn hier schon entschieden ist, sonst setzen ihn decompose bzw. z3
+        path = 'presolve' if presolved.infeasible else None
+        # Reine Differenzsysteme lassen sich ohne z3 exakt lösen, least_solution erkennt sie an den Grundbedingungen
+        if status == 'unknown':
+            status, values = fastpath.least_solution(presolved)
+            path = 'fastpath' if status != 'unknown' else None
+        timings['presolve'] = time.perf_counter() - start
+        if stats is not None:
+            # Variablen, die der Presolve nicht festgelegt hat
+            stats.update(variables=sum(1 for lower, upper in zip(presolved.lower, presolved.upper) if lower != upper),
+                         folded=len(names) - len(reduced.names), removed=presolved.removed, status=status)
+            if path is not None:
+                stats['path'] = path
+        if status == 'unknown' and strategies is None and end is None:
+            start = time.perf_counter()
+            # Zerfallen die Zellen in unabhängige Gruppen, wird jede Gruppe als eigenes kleines Problem gelöst
+            groups = decompose.components(presolved)
+            if len(groups) > 1:
+                status, values = decompose.solve(presolved, groups, weights=reduced.weights)
+                timings['solve'] = time.perf_counter() - start
+                if stats is not None:
+                    stats.update(path='decompose', components=len(groups), status=status)
+                if status == 'unknown':
+                    print("No solution found!")
+                    return []
+        if status == 'infeasible':
+            print("No solution found!")
+            return _remember(solutions, key, [])
+        if status == 'optimal':
+            solution = _table(reduced.expand(values), m, n)
+            if stats is not None and end is not None:
+                stats['lower_bound'] = sum(map(sum, solution))
+            return _remember(solutions, key, solution)
+        cells = {name: z3.Int(name) for name in presolved.names}
+        assertions = presolved.to_z3(cells)
+        terms = [reduced.weights[name] * cells[name] for name in reduced.names] + [z3.IntVal(reduced.offset)]
+        # Gewichtete Summe der unteren Schranken als Startwert für die untere Schranke der Zielfunktion
+        # Hilfsvariablen haben Gewicht 0, ihre Schranke -inf darf die Summe nicht zu nan machen
+        lower = sum(weight * presolved.lower[presolved.index[name]]
+                    for name, weight in reduced.weights.items() if weight)
+        lower = int(lower) + reduced.offset if abs(lower) != float('inf') else None
+    else:
+        key = lower = None
+        start = time.perf_counter()
+        try:
+            assertions, terms, table = _ground_array(conditions, m, n)
+        except ValueError:
+            # Wie bei der flachen Kodierung, z.B. bei einer Variable, die kein Index beschränkt
+            print("Invalid input file!")
+            return None
+        timings['ground'] = time.perf_counter() - start
+        if stats is not None:
+            stats.update(constraints=len(assertions), variables=m * n)
+
+    start = time.perf_counter()
+    solution = engine = None
+    if strategies and encoding == 'flat':
+        status, values, lower, winner = portfolio.race(presolved, reduced.weights, reduced.offset,
+                                                       120 if end is None else _remaining(end), lower, strategies)
+        model = None
+        if values is not None:
+            solution = _table(reduced.expand(values), m, n)
+        if stats is not None:
+            stats['strategy'] = winner
+    elif end is None:
+        # Verwendung des Z3-Optimizers
+        opt = z3.Optimize()
+        # Erhöhung des Timeouts auf 120 Sekunden für längere Berechnungen der Lösung
+        opt.set(timeout=120000)
+        opt.add(assertions)
+
+        # Minimierung nach Summe aller Elemente der Matrix
+        matrix_sum = z3.Sum(terms)
+        opt.minimize(matrix_sum)
+
+        # Überprüft, ob eine Lösung vorhanden ist
+        result = opt.check()
+        status = 'optimal' if result == z3.sat else 'infeasible' if result == z3.unsat else 'unknown'
+        model = opt.model() if result == z3.sat else None
+        engine = opt
+    else:
+        # Anytime: jede gefundene Tabelle wird behalten, bei Fristende gilt sie als zulässig, aber nicht bewiesen optimal
+        search = anytime.Anytime(assertions, terms)
+        status = search.run(_remaining(end), lower)
+        model, lower, engine = search.model, search.lower, search.solver
+    timings['solve'] = time.perf_counter() - start
+    if stats is not None:
+        statistics = engine.statistics() if engine is not None else None
+        stats.update(path='z3', status=status,
+                     z3={key: statistics.get_key_value(key) for key in statistics.keys()} if statistics else {})
+        if end is not None or strategies:
+            stats['lower_bound'] = lower
+    if solution is not None:
+        return _remember(solutions, key if status == 'optimal' else None, solution)
+    if model is not None:
+        start = time.perf_counter()
         # Rückgabe der Lösung als Liste von Listen
-        solution = [[model.evaluate(A[i][j]).as_long() for j in range(n)] for i in range(m)]
-        # Wir schneiden die Lösung aus der größeren Matrix aus (Beispiel: aus 4x4 Matrix wird 3x3 Matrix)
-        solution = solution[1:]
-        solution = [row[1:] for row in solution]
-        return solution
+        if encoding == 'flat':
+            values = {name: model.evaluate(cells[name], model_completion=True).as_long() for name in reduced.names}
+            solution = _table(reduced.expand(values), m, n)
+        else:
+            solution = [[model.evaluate(cell, model_completion=True).as_long() for cell in row] for row in table]
+        timings['extract'] = time.perf_counter() - start
+        # Eine nicht bewiesen optimale Tabelle wird nicht gespeichert
+        return _remember(solutions, key if status == 'optimal' else None, solution)
     else:
         print("No solution found!")
         # Rückgabe der leeren Liste, da keine Lösung gefunden werden konnte
-        return []
+        # Nur ein bewiesenes unsat wird gespeichert, ein Timeout kann beim nächsten Mal anders ausgehen
+        return _remember(solutions, key if status == 'infeasible' else None, [])
+
+
+def _solve_lazy(spec, store, names, templates, timings, solutions, stats, end, strategies):
+    # Schnittebenenverfahren: lösen, die breiten Bedingungen an der Lösung prüfen, nur verletzte Instanzen ergänzen
+    m, n = spec.dimension.first, spec.dimension.second
+    for template in templates:
+        for constraint in template.seed(m * n):
+            store.add(constraint)
+    rounds = 0
+    while True:
+        rounds += 1
+        # Jede Runde ist ein gewöhnliches, kleineres Problem; die Zeiten der Runden werden aufsummiert
+        spent = {}
+        solution = solve_spec(spec, 'flat', spent, (store, names), solutions, stats, _remaining(end), strategies)
+        for phase, seconds in spent.items():
+            timings[phase] = timings.get(phase, 0) + seconds
+        # Eine unlösbare Relaxierung macht auch das ganze Problem unlösbar
+        cuts = [constraint for template in templates for constraint in template.cuts(solution, m * n)] \
+            if solution else []
+        if stats is not None:
+            stats.update(rounds=rounds, cuts=sum(int(template.grounded.sum()) for template in templates),
+                         deferred=sum(template.count - int(template.grounded.sum()) for template in templates))
+        if not cuts:
+            return solution
+        if end is not None and time.monotonic() >= end:
+            # Die letzte Tabelle verletzt noch Bedingungen, zulässig ist sie nicht
+            print("No solution found!")
+            if stats is not None:
+                stats['status'] = 'unknown'
+            return []
+        for constraint in cuts:
+            store.add(constraint)
+
+
+def _table(values, m, n):
+    return [[values[name] for name in row] for row in grounding.Grid(m, n, str).rows()]
+
+
+def _remember(solutions, key, solution):
+    if key:
+        solutions.put(key, solution)
+    return solution
+
+
+def _ground_flat(conditions, m, n, templates=None):
+    # Jede Zelle ist eine eigene Int-Variable, die Indizes sind durch die Belegungen immer konkret und gültig
+    # Mit einer Liste templates landen breite Bedingungen als lazy.Template dort statt im Store
+    grid = grounding.Grid(m, n, grounding.Poly.var)
+    # Hilfsvariablen aus rewrite.compress stehen hinter den Zellen
+    names = list(grid.names)
+    # Die Instanzen werden erst normalisiert und ohne Duplikate und Tautologien gesammelt
+    store = grounding.ConstraintStore()
+    for condition in conditions:
+        # Quadrate wie (x - y)*(x - y) >= 1 werden vorher in lineare Bedingungen und Disjunktionen umgeschrieben
+        # A[1][i] < A[2][j] wird über eine Hilfsvariable zu 2n statt n*n Instanzen
+        for part in (piece for part in rewrite.linearize(condition) for piece in rewrite.compress(part, names, m, n)):
+            # Teile mit Hilfsvariablen sind nie breit, lazy.Template kennt nur Tabellenzellen
+            if templates is not None and not rewrite.auxiliaries(part):
+                template = lazy.Template(part, m, n, names)
+                if template.wide:
+                    templates.append(template)
+                    continue
+            if vectorized.np is not None:
+                # Indizes, Bereichsprüfungen und lineare Koeffizienten für alle Belegungen auf einmal in NumPy
+                for constraint in vectorized.instances(part, m, n, names):
+                    store.add(constraint)
+                continue
+            # Jede Bedingung wird einmal in eine Funktion übersetzt und dann nur noch mit den Indizes aufgerufen
+            function = part.compile()
+            for env in grounding.bindings(part, m, n):
+                store.add(function(grid.cell, env))
+    return store, names
+
+
+def _ground_array(conditions, m, n):
+    # Ersatzlösung: Array-Theorie mit denselben Belegungen
+    # Erstellung eines Arrays mit Z3 zur Repräsentation der Matrizen
+    A = z3.Array('A', z3.IntSort(), z3.ArraySort(z3.IntSort(), z3.IntSort()))
+    cell = lambda i, j: A[i][j]
+
+    # Hinzufügen der Bedingungen und Umwandlung in Z3
+    assertions = []
+    for condition in conditions:
+        function = condition.compile()
+        for env in grounding.bindings(condition, m, n):
+            assertions.append(function(cell, env))
 
+    table = [[A[i][j] for j in range(1, n + 1)] for i in range(1, m + 1)]
+    # Die 0 hält die Zielfunktion auch bei einer leeren Tabelle ein z3-Ausdruck, z3.Sum([]) wäre die Zahl 0
+    return assertions, [term for row in table for term in row] + [z3.IntVal(0)], table
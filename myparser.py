@@ -1,13 +1,49 @@
+import io
+import re
+
 from z3 import IntVal, Int, z3
 
 result = lambda p: p[0][0]
 rest = lambda p: p[0][1]
 
 
+class Cursor:  # Eingabeposition in einem gemeinsamen Puffer, Weiterlesen kopiert keine Teilstrings
+    """
+    >>> Cursor("abc", 1)
+    Cursor(1, 'bc')
+    >>> ParseFullCondition().parse(Cursor("A[i][j] <= 10; A[i][j] > 0;"))
+    [(SmallerEqual(Matrix(Var(i), Var(j)), Con(10)), Cursor(15, 'A[i][j] > 0;'))]
+    """
+    __slots__ = ('text', 'pos')
+
+    def __init__(self, text, pos=0):
+        self.text = text
+        self.pos = pos
+
+    def __repr__(self):
+        return f'Cursor({self.pos}, {self.rest()!r})'
+
+    def rest(self):
+        return self.text[self.pos:]
+
+
 class Parser:
+    memo = False  # Nichtterminale mit memo = True werden im Packrat-Modus pro Eingabeposition nur einmal geparst
+    table = None  # Memo-Tabelle des laufenden Packrat-Parses, Schlüssel ist (Parser, Position)
 
     def parse(self, inp):
-        return self.parser.parse(inp)
+        # Kompatibilitätsschicht: Strings werden in einen Cursor verpackt und die Reste wieder als String zurückgegeben
+        if isinstance(inp, Cursor):
+            return self.run(inp)
+        return [(x, cur.rest()) for x, cur in self.run(Cursor(inp))]
+
+    def run(self, cur):
+        if not self.memo or Parser.table is None:
+            return self.parser.run(cur)
+        key = (type(self), cur.pos)
+        if key not in Parser.table:
+            Parser.table[key] = self.parser.run(cur)
+        return Parser.table[key]
 
     def cons(x, xs):
         if type(x) == str and xs == []:
@@ -36,22 +72,22 @@ class ParseItem(Parser):
     []
     """
 
-    def parse(self, inp):
-        if inp == "":
+    def run(self, cur):
+        if cur.pos >= len(cur.text):
             return []
-        return [(inp[0], inp[1:])]
+        return [(cur.text[cur.pos], Cursor(cur.text, cur.pos + 1))]
 
 
 class Return(Parser):
     def __init__(self, x):
         self.x = x
 
-    def parse(self, inp):
-        return [(self.x, inp)]
+    def run(self, cur):
+        return [(self.x, cur)]
 
 
 class Fail(Parser):
-    def parse(self, inp):
+    def run(self, cur):
         return []
 
 
@@ -60,10 +96,10 @@ class Seq(Parser):
         self.first = first
         self.and_then = and_then
 
-    def parse(self, inp):
-        p = self.first.parse(inp)
+    def run(self, cur):
+        p = self.first.run(cur)
         if p != []:
-            return self.and_then(result(p)).parse(rest(p))
+            return self.and_then(result(p)).run(rest(p))
         return []
 
 
@@ -72,11 +108,31 @@ class OrElse(Parser):
         self.parser1 = parser1
         self.parser2 = parser2
 
-    def parse(self, inp):
-        p = self.parser1.parse(inp)
+    def run(self, cur):
+        p = self.parser1.run(cur)
         if p != []:
             return p
-        return self.parser2.parse(inp)
+        return self.parser2.run(cur)
+
+
+class Packrat(Parser):  # Packrat-Modus: jedes Nichtterminal wird an jeder Position höchstens einmal geparst
+    """
+    >>> Packrat(ParseFullCondition()).parse("A[i][j] < A[i+1][j];")
+    [(Smaller(Matrix(Var(i), Var(j)), Matrix(Plus(Var(i), Con(1)), Var(j))), '')]
+    >>> Packrat(ParseFullCondition()).parse("(A[i][j] - A[i+1][j])*(A[i][j] - A[i+1][j]) >= 1 ;")
+    [(BiggerEqual(Times(Parenthesis(Sub(Matrix(Var(i), Var(j)), Matrix(Plus(Var(i), Con(1)), Var(j)))), Parenthesis(Sub(Matrix(Var(i), Var(j)), Matrix(Plus(Var(i), Con(1)), Var(j))))), Con(1)), '')]
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def run(self, cur):
+        outer = Parser.table
+        Parser.table = {}
+        try:
+            return self.parser.run(cur)
+        finally:
+            Parser.table = outer
 
 
 class ParseSome(Parser):
@@ -174,6 +230,8 @@ class ParseToken(Parser):
 
 
 class ParseNumber(Parser):
+    memo = True
+
     def __init__(self):
         self.parser = ParseToken(ParseInt())
 
@@ -195,6 +253,8 @@ class ParseIdent(Parser):
 
 
 class ParseIdentifier(Parser):
+    memo = True
+
     def __init__(self):
         self.parser = ParseToken(ParseIdent())
 
@@ -236,6 +296,8 @@ class ParseDimension(
     [(Dimension(2, 2), '')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseNumber() >> (lambda x:
                                          ParseChar(',') >> (lambda _:
@@ -258,8 +320,9 @@ class Con:
     def to_z3(self):
         return IntVal(self.con)
 
-    def to_z3_new(self):
-        return IntVal(self.con)
+    def compile(self):
+        con = self.con
+        return lambda cell, env: con
 
 
 class Var:
@@ -272,11 +335,14 @@ class Var:
     def to_z3(self):
         return Int(self.var)
 
-    def to_z3_new(self):
-        return Int(self.var)
+    def compile(self):
+        var = self.var
+        return lambda cell, env: env[var]
 
 
 class ParseExpr(Parser):  # Dieser Parser unterscheidet zwischen Con durch ParseNumber oder Var durch ParseIdentifier
+    memo = True
+
     def __init__(self):
         """
         >>> ParseExpr().parse("123 abc")
@@ -300,8 +366,9 @@ class Times:
     def to_z3(self):
         return f'{self.x.to_z3()} * {self.y.to_z3()}'
 
-    def to_z3_new(self):
-        return self.x.to_z3_new() * self.y.to_z3_new()
+    def compile(self):
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: x(cell, env) * y(cell, env)
 
 
 class ParseMultiply(
@@ -313,6 +380,8 @@ class ParseMultiply(
     [(Times(Con(12), Var(x)), 'abc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseExpr() >> (lambda x:
                                        ParseChar('*') >> (lambda _:
@@ -331,8 +400,9 @@ class Plus:
     def to_z3(self):
         return f'{self.x.to_z3()} + {self.y.to_z3()}'
 
-    def to_z3_new(self):
-        return self.x.to_z3_new() + self.y.to_z3_new()
+    def compile(self):
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: x(cell, env) + y(cell, env)
 
 
 class ParseAdd(Parser):  # hier wird das + zeichen geparst und ParseMultiply verwendet
@@ -343,6 +413,8 @@ class ParseAdd(Parser):  # hier wird das + zeichen geparst und ParseMultiply ver
     [(Plus(Con(123), Plus(Times(Con(125), Con(71)), Times(Con(10), Var(abc)))), '')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseMultiply() >> (lambda x:
                                            ParseChar('+') >> (lambda _:
@@ -350,11 +422,16 @@ class ParseAdd(Parser):  # hier wird das + zeichen geparst und ParseMultiply ver
                                                                              Return(Plus(x, y)))))) ^ ParseMultiply()
 
 
-class Matrix:
+class Matrix:  # Tabellenreferenz, compile() liefert eine Funktion (cell, env), die cell mit den berechneten Indizes aufruft
+    """
+    >>> condition = CompiledCondition.parse("A[i][j] < A[i+1][j] + 2;")[0][0].compile()
+    >>> condition(lambda i, j: z3.Int(f'A_{i}_{j}'), {'i': 1, 'j': 3})
+    A_1_3 < A_2_3 + 2
+    """
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
-        # self.matrix = matrix
 
     def __repr__(self):
         return f'Matrix({self.x}, {self.y})'
@@ -362,8 +439,9 @@ class Matrix:
     def to_z3(self):
         return f'A[{self.x.to_z3()}][{self.y.to_z3()}]'
 
-    # def to_z3_new(self):
-    # return self.matrix[self.x.to_z3_new()][self.y.to_z3_new()]
+    def compile(self):
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: cell(x(cell, env), y(cell, env))
 
 
 class ParseBrackets(Parser):  # hier werden die [] zeichen geparst und durch das ParseAdd auch der inhalt der klammern
@@ -374,6 +452,8 @@ class ParseBrackets(Parser):  # hier werden die [] zeichen geparst und durch das
     [(Plus(Con(1), Var(a)), 'anc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseToken(ParseChar('[')) >> (lambda _:
                                                       ParseAdd() >> (lambda x:
@@ -390,6 +470,8 @@ class ParseMatrix(
     [(Matrix(Var(i), Var(j)), 'abc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseChar('A') >> (lambda _:
                                           ParseBrackets() >> (lambda x:
@@ -408,8 +490,9 @@ class Smaller:
     def to_z3(self):
         return f'{self.x.to_z3()} < {self.y.to_z3()}'
 
-    def to_z3_new(self):
-        return self.x.to_z3_new() < self.y.to_z3_new()
+    def compile(self):
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: x(cell, env) < y(cell, env)
 
 
 class Bigger:
@@ -423,8 +506,9 @@ class Bigger:
     def to_z3(self):
         return f'{self.x.to_z3()} > {self.y.to_z3()}'
 
-    def to_z3_new(self):
-        return self.x.to_z3_new() > self.y.to_z3_new()
+    def compile(self):
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: x(cell, env) > y(cell, env)
 
 
 class SmallerEqual:
@@ -438,8 +522,9 @@ class SmallerEqual:
     def to_z3(self):
         return f'({self.x.to_z3()} <= {self.y.to_z3()})'
 
-    def to_z3_new(self):
-        return self.x.to_z3_new() <= self.y.to_z3_new()
+    def compile(self):
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: x(cell, env) <= y(cell, env)
 
 
 class BiggerEqual:
@@ -453,8 +538,9 @@ class BiggerEqual:
     def to_z3(self):
         return f'{self.x.to_z3()} >= {self.y.to_z3()}'
 
-    def to_z3_new(self):
-        return self.x.to_z3_new() >= self.y.to_z3_new()
+    def compile(self):
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: x(cell, env) >= y(cell, env)
 
 
 class Equal:
@@ -468,8 +554,26 @@ class Equal:
     def to_z3(self):
         return f'{self.x.to_z3()} == {self.y.to_z3()}'
 
-    def to_z3_new(self):
-        return self.x.to_z3_new() == self.y.to_z3_new()
+    def compile(self):
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: x(cell, env) == y(cell, env)
+
+
+class Or:  # Entsteht nur durch Umschreiben (rewrite.py), nicht beim Parsen
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __repr__(self):
+        return f'Or({self.x}, {self.y})'
+
+    def to_z3(self):
+        return f'z3.Or({self.x.to_z3()}, {self.y.to_z3()})'
+
+    def compile(self):
+        # Bei Poly-Zellen verknüpft | kanonische Bedingungen (grounding.Disjunction), bei z3-Zellen entsteht z3.Or
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: x(cell, env) | y(cell, env)
 
 
 class ParseEqual(Parser):  # Parsed das = zeichen und ruft ParseAddTable auf
@@ -482,6 +586,8 @@ class ParseEqual(Parser):  # Parsed das = zeichen und ruft ParseAddTable auf
     [(Equal(Var(x), Matrix(Var(x), Var(a))), 'abc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseAddTable() >> (lambda x:
                                            ParseToken(ParseChar('=')) >> (lambda _:
@@ -517,6 +623,8 @@ class ParseSmallerEqual(
     [(SmallerEqual(Matrix(Var(i), Var(j)), Con(10)), '')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseEqual() >> (lambda x:
                                         ParseLessEqual() >> (lambda _:
@@ -536,6 +644,8 @@ class ParseBiggerEqual(
     [(BiggerEqual(Var(x), Matrix(Var(x), Var(a))), 'abc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseSmallerEqual() >> (lambda x:
                                                ParseMoreEqual() >> (lambda _:
@@ -554,6 +664,8 @@ class ParseBigger(Parser):  # Parsed das > zeichen und ruft ParseBiggerEqual auf
     [(Bigger(Var(x), Matrix(Var(x), Var(a))), 'abc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseBiggerEqual() >> (lambda x:
                                               ParseToken(ParseChar('>')) >> (lambda _:
@@ -572,6 +684,8 @@ class ParseSmaller(Parser):  # Wird benutzt um das < zeichen zu parsen und ruft
     [(Smaller(Var(x), Matrix(Var(x), Var(a))), 'abc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseBigger() >> (lambda x:
                                          ParseToken(ParseChar('<')) >> (lambda _:
@@ -589,6 +703,8 @@ class ParseMatrixOrNumber(
     [(Con(21), 'abc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseMatrix() >> (lambda x: Return(x))) ^ \
                       (ParseNumber() >> (lambda x: Return(Con(x)))) ^ \
@@ -611,6 +727,8 @@ class ParseCompare(
     [(Equal(Matrix(Con(1), Con(2)), Matrix(Var(x), Var(a))), 'abc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseSmaller())
 
@@ -625,8 +743,8 @@ class Parenthesis:
     def to_z3(self):
         return f'({self.x.to_z3()})'
 
-    def to_z3_new(self):
-        return self.x.to_z3_new()
+    def compile(self):
+        return self.x.compile()
 
 
 class Sub:
@@ -640,8 +758,9 @@ class Sub:
     def to_z3(self):
         return f'{self.x.to_z3()} - {self.y.to_z3()}'
 
-    def to_z3_new(self):
-        return self.x.to_z3_new() - self.y.to_z3_new()
+    def compile(self):
+        x, y = self.x.compile(), self.y.compile()
+        return lambda cell, env: x(cell, env) - y(cell, env)
 
 
 class ParseSub(Parser):  # parst das - zeichen und führt ParseMultiplyTable aus
@@ -652,6 +771,8 @@ class ParseSub(Parser):  # parst das - zeichen und führt ParseMultiplyTable aus
     [(Sub(Times(Matrix(Con(1), Con(2)), Matrix(Var(a), Var(b))), Con(2)), 'abc')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseMultiplyTable() >> (lambda x:
                                                 ParseToken(ParseChar('-')) >> (lambda _:
@@ -672,6 +793,8 @@ class ParseMultiplyTable(
     [(Parenthesis(Plus(Times(Matrix(Con(1), Con(2)), Matrix(Var(a), Var(b))), Con(2))), 'as')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseMatrixOrNumber() >> (lambda x:
                                                  ParseToken(ParseChar('*')) >> (lambda _:
@@ -700,6 +823,8 @@ class ParseAddTable(Parser):  # parst das + zeichen und führt ParseSub aus
     [(Times(Parenthesis(Sub(Matrix(Var(a), Var(v)), Con(5))), Parenthesis(Plus(Matrix(Var(a), Var(v)), Con(5)))), '')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseSub() >> (lambda x:
                                       ParseToken(ParseChar('+')) >> (lambda _:
@@ -715,6 +840,8 @@ class ParseParenthesis(Parser):  # Parst die klammern
     [(Parenthesis(Plus(Times(Matrix(Con(1), Con(2)), Matrix(Var(a), Var(b))), Con(2))), 'as')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseToken(ParseChar('(')) >> (lambda _:
                                                       ParseAddTable() >> (lambda x:
@@ -761,12 +888,232 @@ class ParseFullCondition(
     [(BiggerEqual(Times(Parenthesis(Sub(Matrix(Var(i), Var(j)), Matrix(Var(i), Plus(Var(j), Con(1))))), Parenthesis(Sub(Matrix(Var(i), Var(j)), Matrix(Var(i), Plus(Var(j), Con(1)))))), Con(1)), '')]
     """
 
+    memo = True
+
     def __init__(self):
         self.parser = (ParseCompare() >> (lambda x:
                                           ParseToken(ParseChar(';')) >> (lambda _:
                                                                          Return(x))))
 
 
+#####################
+# Tokenizer/Grammatik #
+#####################
+
+TOKEN = re.compile(r'\s*(?:(?P<INT>[0-9]+)|(?P<IDENT>[^\W\d_][^\W_]*)|(?P<OP>\S))')
+
+
+def tokenize(text):  # Zerlegt eine Zeile in einem Durchlauf in Tokens (Art, Wert, Startposition)
+    """
+    >>> tokenize("A[i] >= -5;")
+    [('IDENT', 'A', 0), ('[', '[', 1), ('IDENT', 'i', 2), (']', ']', 3), ('>', '>', 5), ('=', '=', 6), ('-', '-', 8), ('INT', 5, 9), (';', ';', 10)]
+    """
+    tokens = []
+    for match in TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind is None:  # nur noch Leerzeichen am Ende
+            break
+        value, start = match.group(kind), match.start(kind)
+        if kind == 'INT':
+            value = int(value)
+        elif kind == 'OP':
+            kind = value = value.replace('\u2212', '-')  # typografisches Minus wie in der Aufgabenstellung
+        tokens.append((kind, value, start))
+    return tokens
+
+
+class ParseKind(Parser):  # Liest ein Token der gegebenen Art (und optional mit dem gegebenen Wert)
+    def __init__(self, kind, value=None):
+        self.kind = kind
+        self.value = value
+
+    def run(self, cur):
+        if cur.pos >= len(cur.text):
+            return []
+        kind, value, _ = cur.text[cur.pos]
+        if kind != self.kind or (self.value is not None and value != self.value):
+            return []
+        return [(value, Cursor(cur.text, cur.pos + 1))]
+
+
+class Sequence(Parser):  # Feste Folge von Parsern, liefert die Liste der Ergebnisse ohne neue Parser zu erzeugen
+    def __init__(self, *parsers):
+        self.parsers = parsers
+
+    def run(self, cur):
+        values = []
+        for parser in self.parsers:
+            p = parser.run(cur)
+            if p == []:
+                return []
+            values.append(result(p))
+            cur = rest(p)
+        return [(values, cur)]
+
+
+class Map(Parser):
+    def __init__(self, parser, f):
+        self.parser = parser
+        self.f = f
+
+    def run(self, cur):
+        p = self.parser.run(cur)
+        if p == []:
+            return []
+        return [(self.f(result(p)), rest(p))]
+
+
+class Chain(Parser):  # Rechtsassoziative Operatorebene: operand (op operand)*, ohne erneutes Parsen des linken Operanden
+    def __init__(self, operand, op, build):
+        self.operand = operand
+        self.op = op
+        self.build = build
+
+    def run(self, cur):
+        p = self.operand.run(cur)
+        if p == []:
+            return []
+        operands = [result(p)]
+        cur = rest(p)
+        while True:
+            q = self.op.run(cur)
+            if q == []:
+                break
+            p = self.operand.run(rest(q))
+            if p == []:
+                break
+            operands.append(result(p))
+            cur = rest(p)
+        x = operands.pop()
+        while operands:
+            x = self.build(operands.pop(), x)
+        return [(x, cur)]
+
+
+class Rule(Parser):  # Platzhalter für rekursive Regeln, wird nach dem Aufbau der Grammatik gesetzt
+    def __init__(self):
+        self.parser = Fail()
+
+
+class Compiled(Parser):  # Führt eine Token-Grammatik auf den Tokens einer Zeile aus, Reste werden als Text zurückgegeben
+    """
+    >>> CompiledCondition.parse("A[i][i+k] < A[i][i+k+1];")
+    [(Smaller(Matrix(Var(i), Plus(Var(i), Var(k))), Matrix(Var(i), Plus(Var(i), Plus(Var(k), Con(1))))), '')]
+    >>> CompiledCondition.parse("(A[i][j] - A[i+1][j])*(A[i][j] - A[i+1][j]) >= 1 ;")
+    [(BiggerEqual(Times(Parenthesis(Sub(Matrix(Var(i), Var(j)), Matrix(Plus(Var(i), Con(1)), Var(j)))), Parenthesis(Sub(Matrix(Var(i), Var(j)), Matrix(Plus(Var(i), Con(1)), Var(j))))), Con(1)), '')]
+    >>> CompiledCondition.parse("A[1][2] * A[a][b] - 2 - ( A[a][v] - 5 ) <= 3; abc")
+    [(SmallerEqual(Sub(Times(Matrix(Con(1), Con(2)), Matrix(Var(a), Var(b))), Sub(Con(2), Parenthesis(Sub(Matrix(Var(a), Var(v)), Con(5))))), Con(3)), 'abc')]
+    >>> CompiledCondition.parse("A[i][j] > \u22125 ;")
+    [(Bigger(Matrix(Var(i), Var(j)), Con(-5)), '')]
+    >>> CompiledDimension.parse("01 , 3   ;")
+    [(Dimension(1, 3), '')]
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def parse(self, inp):
+        tokens = tokenize(inp)
+        return [(x, inp[tokens[cur.pos][2]:] if cur.pos < len(tokens) else '')
+                for x, cur in self.parser.run(Cursor(tokens))]
+
+
+def build_grammar():  # Baut die Grammatik einmalig als Objektgraph auf, Rekursion läuft über Rule-Platzhalter
+    number = Map(Sequence(ParseKind('-'), ParseKind('INT')), lambda v: -v[1]) ^ ParseKind('INT')
+
+    # Indexausdrücke innerhalb der eckigen Klammern
+    expr = Map(number, Con) ^ Map(ParseKind('IDENT'), Var)
+    index = Chain(Chain(expr, ParseKind('*'), Times), ParseKind('+'), Plus)
+    brackets = Map(Sequence(ParseKind('['), index, ParseKind(']')), lambda v: v[1])
+    matrix = Map(Sequence(ParseKind('IDENT', 'A'), brackets, brackets), lambda v: Matrix(v[1], v[2]))
+
+    # Tabellenausdrücke und Vergleiche, von der stärksten zur schwächsten Bindung
+    add_table = Rule()
+    parenthesis = Map(Sequence(ParseKind('('), add_table, ParseKind(')')), lambda v: Parenthesis(v[1]))
+    atom = matrix ^ Map(number, Con) ^ Map(ParseKind('IDENT'), Var) ^ parenthesis
+    sub = Chain(Chain(atom, ParseKind('*'), Times), ParseKind('-'), Sub)
+    add_table.parser = Chain(sub, ParseKind('+'), Plus)
+    equal = Chain(add_table, ParseKind('='), Equal)
+    smaller_equal = Chain(equal, Sequence(ParseKind('<'), ParseKind('=')), SmallerEqual)
+    bigger_equal = Chain(smaller_equal, Sequence(ParseKind('>'), ParseKind('=')), BiggerEqual)
+    bigger = Chain(bigger_equal, ParseKind('>'), Bigger)
+    smaller = Chain(bigger, ParseKind('<'), Smaller)
+
+    condition = Map(Sequence(smaller, ParseKind(';')), lambda v: v[0])
+    dimension = Map(Sequence(number, ParseKind(','), number, ParseKind(';')), lambda v: Dimension(v[0], v[2])) ^ number
+    return Compiled(dimension), Compiled(condition)
+
+
+CompiledDimension, CompiledCondition = build_grammar()  # Einmal aufgebaute Grammatik für Kopfzeile und Bedingungen
+
+
+class Spec:  # Eigenständiges Parse-Ergebnis einer Spezifikation, unabhängig von den globalen Variablen
+    def __init__(self, dimension, conditions):
+        self.dimension = dimension
+        self.conditions = conditions
+
+    def __repr__(self):
+        return f'Spec({self.dimension}, {len(self.conditions)} conditions)'
+
+
+def load_spec(filename):  # Liest eine Datei ein, Kopfzeile mit den Dimensionen, danach die Bedingungen
+    """
+    >>> load_spec('Test.txt')
+    Spec(Dimension(3, 3), 4 conditions)
+    """
+    with open(filename, 'r') as file:
+        dimension, conditions = read_spec(file, filename)
+        return Spec(dimension, list(conditions))
+
+
+def parse_spec(text, filename='<spec>'):
+    """
+    >>> parse_spec("2, 3;\\nA[i][j] > 0; A[1][1]\\n  = 2 ;\\n")
+    Spec(Dimension(2, 3), 2 conditions)
+    """
+    dimension, conditions = read_spec(io.StringIO(text), filename)
+    return Spec(dimension, list(conditions))
+
+
+def statements(file, size=1 << 16):  # Zerlegt einen Textstrom blockweise an ';', im Speicher liegt nur die aktuelle Anweisung
+    """
+    >>> list(statements(io.StringIO("2, 3;\\nA[i][j] > 0; A[1][1]\\n  = 2 ;;\\n"), size=4))
+    ['2, 3;', 'A[i][j] > 0;', 'A[1][1]\\n  = 2;']
+    """
+    pending = []
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            break
+        *complete, rest = chunk.split(';')
+        for part in complete:
+            pending.append(part)
+            statement = ''.join(pending).strip()
+            pending = []
+            if statement:
+                yield statement + ';'
+        pending.append(rest)
+    statement = ''.join(pending).strip()
+    if statement:
+        yield statement  # ohne ';' scheitert der Parser daran mit einer Fehlermeldung
+
+
+def read_spec(file, filename='<spec>'):  # Dimension und ein Generator, der die Bedingungen erst beim Weiterlesen parst
+    stream = statements(file)
+    dimension = CompiledDimension.parse(next(stream, ''))
+    if not dimension or not isinstance(dimension[0][0], Dimension):
+        raise ValueError(f'{filename}: ungültige Kopfzeile')
+    return dimension[0][0], _conditions(stream, filename)
+
+
+def _conditions(stream, filename):
+    for statement in stream:
+        condition = CompiledCondition.parse(statement)
+        if not condition:
+            raise ValueError(f'{filename}: ungültige Bedingung {statement!r}')
+        yield condition[0][0]
+
+
 class StartToParse:  # StartToParse wird verwendet um die Textdatei einzulesen, die erste Zeile zu benutzen für die Dimensionsbestimmung und die restlichen als conditions zu parsen
     def start(self, filename):
         """>>> StartToParse().start(filename) #Die Tests hier werden Fehlschlagen bei einer anderen Textdatei
@@ -784,13 +1131,13 @@ class StartToParse:  # StartToParse wird verwendet um die Textdatei einzulesen,
             parsed = []
             for x in range(0, len(lines)):
                 if x == 0:
-                    parsed.append(ParseDimension().parse(lines[x]))
+                    parsed.append(CompiledDimension.parse(lines[x]))
                     global Dimensions
-                    Dimensions = ParseDimension().parse(lines[x])[0][0]
+                    Dimensions = parsed[x][0][0]
                 else:
-                    parsed.append(ParseFullCondition().parse(lines[x]))
+                    parsed.append(CompiledCondition.parse(lines[x]))
                     global AllConditions
-                    AllConditions.append(ParseFullCondition().parse(lines[x])[0][0])
+                    AllConditions.append(parsed[x][0][0])
 
             # for x in range(0, len(parsed)):
             # if parsed[x][0][1] == '':  # Hier wird überprüft ob der Parser die komplette Zeile parsen konnte
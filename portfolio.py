@@ -0,0 +1,114 @@
+import multiprocessing
+import time
+from queue import Empty
+
+import z3
+
+import anytime
+
+GRACE = 1.0  # Sekunden, die nach der Frist noch auf Ergebnisse gewartet wird
+
+
+def _optimize(assertions, terms, seconds, lower):
+    opt = z3.Optimize()
+    opt.set(timeout=max(1, int(seconds * 1000)))
+    opt.add(assertions)
+    opt.minimize(z3.Sum(terms))
+    result = opt.check()
+    if result == z3.sat:
+        return 'optimal', opt.model(), None
+    return ('infeasible' if result == z3.unsat else 'unknown'), None, lower
+
+
+def _optimize_simplex(assertions, terms, seconds, lower):
+    # Der alte Simplex-Löser für Arithmetik, jeder Prozess hat seine eigenen globalen Parameter
+    z3.set_param('smt.arith.solver', 2)
+    return _optimize(assertions, terms, seconds, lower)
+
+
+def _binary(assertions, terms, seconds, lower):
+    search = anytime.Anytime(assertions, terms)
+    return search.run(seconds, lower), search.model, search.lower
+
+
+def _tactic(assertions, terms, seconds, lower):
+    # Gleichungen und feste Werte werden vor dem SMT-Kern eliminiert
+    solver = z3.Then('simplify', 'propagate-values', 'solve-eqs', 'smt').solver()
+    search = anytime.Anytime(assertions, terms, solver)
+    return search.run(seconds, lower), search.model, search.lower
+
+
+STRATEGIES = {  # Name -> Funktion(assertions, terms, seconds, lower) -> (status, model, lower)
+    'optimize': _optimize,
+    'optimize-simplex': _optimize_simplex,
+    'binary': _binary,
+    'tactic': _tactic,
+}
+
+
+def _work(strategy, presolved, weights, offset, seconds, lower, queue):
+    try:
+        cells = {name: z3.Int(name) for name in presolved.names}
+        assertions = presolved.to_z3(cells)
+        terms = [weights.get(name, 1) * cell for name, cell in cells.items()] + [z3.IntVal(offset)]
+        status, model, lower = STRATEGIES[strategy](assertions, terms, seconds, lower)
+        values = None
+        if model is not None:
+            values = {name: model.evaluate(cell, model_completion=True).as_long() for name, cell in cells.items()}
+        queue.put((strategy, status, values, lower))
+    except Exception:
+        queue.put((strategy, 'unknown', None, None))
+
+
+def race(presolved, weights=None, offset=0, seconds=120, lower=None, strategies=tuple(STRATEGIES)):  # Löst dasselbe Problem mit mehreren Strategien in eigenen Prozessen
+    """
+    >>> from grounding import ConstraintStore, Poly
+    >>> from presolve import Presolve
+    >>> x, y = Poly.var('x'), Poly.var('y')
+    >>> store = ConstraintStore()
+    >>> for constraint in (x >= 0, x <= y, x * y >= 6):
+    ...     _ = store.add(constraint)
+    >>> status, values, lower, strategy = race(Presolve(store, ['x', 'y']), seconds=30)
+    >>> status, values, lower
+    ('optimal', {'x': 2, 'y': 3}, 5)
+    """
+    # Zielfunktion: Summe von weights[Name] * Variable (Gewicht sonst 1) plus offset
+    # Ergebnis: (Status, Werte oder None, untere Schranke, Name der Strategie, von der die Werte stammen)
+    weights = weights or {}
+    queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_work, args=(name, presolved, weights, offset, seconds, lower, queue),
+                                       daemon=True)
+               for name in strategies]
+    for worker in workers:
+        worker.start()
+    end = time.monotonic() + seconds + GRACE
+    results = []
+    try:
+        while len(results) < len(workers):
+            try:
+                result = queue.get(timeout=max(0.0, end - time.monotonic()))
+            except Empty:
+                break
+            results.append(result)
+            # Ein bewiesenes Ergebnis beendet das Rennen, die übrigen Prozesse werden abgebrochen
+            if result[1] in ('optimal', 'infeasible'):
+                break
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    objective = lambda values: sum(weights.get(name, 1) * value for name, value in values.items()) + offset
+    name, status, values, bound = results[-1] if results else (None, 'unknown', None, None)
+    if status == 'optimal':
+        return status, values, objective(values), name
+    if status == 'infeasible':
+        return status, None, None, name
+    bounds = [bound for _, _, _, bound in results if bound is not None] + ([lower] if lower is not None else [])
+    lower = max(bounds, default=None)
+    found = [(objective(values), name, values) for name, _, values, _ in results if values is not None]
+    if not found:
+        return 'unknown', None, lower, None
+    total, name, values = min(found, key=lambda result: result[0])
+    return 'feasible', values, lower, name
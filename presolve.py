@@ -0,0 +1,145 @@
+from array import array
+from collections import deque
+from math import ceil, floor, inf
+
+import z3
+
+from grounding import Disjunction
+
+
+class Presolve:  # Faltet Schranken in Intervalle pro Variable und propagiert lineare Bedingungen bis zum Fixpunkt
+    """
+    >>> from grounding import ConstraintStore, Poly
+    >>> x, y = Poly.var('A_1_1'), Poly.var('A_1_2')
+    >>> store = ConstraintStore()
+    >>> for constraint in (x > 0, y > 0, x + y == 0):
+    ...     _ = store.add(constraint)
+    >>> Presolve(store, ['A_1_1', 'A_1_2']).infeasible
+    True
+    >>> store = ConstraintStore()
+    >>> for constraint in (x <= 10, y <= 10, x > -5, x < y, x * y >= 1):
+    ...     _ = store.add(constraint)
+    >>> presolved = Presolve(store, ['A_1_1', 'A_1_2'])
+    >>> presolved.bounds('A_1_1'), presolved.bounds('A_1_2'), presolved.constraints
+    ((-4, 9), (-3, 10), [A_1_1 - A_1_2 <= -1, -A_1_1*A_1_2 <= -1])
+    """
+
+    def __init__(self, store, names, budget=5):
+        self.names = list(names)
+        self.index = {name: k for k, name in enumerate(self.names)}
+        self.lower = array('d', [-inf] * len(self.names))
+        self.upper = array('d', [inf] * len(self.names))
+        self.constraints = []  # Bedingungen, die nach dem Presolve noch an den Solver gehen
+        self.removed = 0
+        self.infeasible = store.infeasible
+        if not self.infeasible:
+            self._run(list(store), budget)
+
+    def bounds(self, name):
+        k = self.index[name]
+        return tuple(None if abs(b) == inf else int(b) for b in (self.lower[k], self.upper[k]))
+
+    def _slot(self, name):
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            self.lower.append(-inf)
+            self.upper.append(inf)
+        return self.index[name]
+
+    def _run(self, constraints, budget):
+        rows = []  # Lineare Zeilen sum(coef * x) + const <= 0, Gleichungen als zwei Zeilen
+        for constraint in constraints:
+            if isinstance(constraint, Disjunction) or any(len(mono) != 1 for mono, _ in constraint.terms):
+                self.constraints.append(constraint)
+                continue
+            row = ([self._slot(mono[0]) for mono, _ in constraint.terms], [coef for _, coef in constraint.terms])
+            if len(row[0]) > 1:
+                self.constraints.append(constraint)
+            else:
+                self.removed += 1
+            rows.append((row[0], row[1], constraint.const))
+            if constraint.op == '==':
+                rows.append((row[0], [-coef for coef in row[1]], -constraint.const))
+
+        # Arbeitsliste: eine Zeile wird erneut geprüft, wenn sich eine Schranke einer ihrer Variablen ändert
+        watchers = {}
+        for r, (slots, _, _) in enumerate(rows):
+            for k in slots:
+                watchers.setdefault(k, []).append(r)
+        queue = deque(range(len(rows)))
+        queued = set(queue)
+        steps = (budget + 1) * len(rows)
+        while queue and steps > 0:
+            steps -= 1
+            r = queue.popleft()
+            queued.discard(r)
+            changed = self._propagate(*rows[r])
+            if changed is None:
+                self.infeasible = True
+                return
+            for k in changed:
+                for other in watchers[k]:
+                    if other not in queued:
+                        queued.add(other)
+                        queue.append(other)
+
+        # Bedingungen, die bei den gefundenen Schranken immer erfüllt sind, muss der Solver nicht mehr sehen
+        remaining = []
+        for constraint in self.constraints:
+            # Eine Disjunktion mit einem immer erfüllten Teil ist selbst immer erfüllt
+            parts = constraint.parts if isinstance(constraint, Disjunction) else (constraint,)
+            if any(self._always(part) for part in parts):
+                self.removed += 1
+            else:
+                remaining.append(constraint)
+        self.constraints = remaining
+
+    def _always(self, constraint):
+        return constraint.op == '<=' and all(len(mono) == 1 and mono[0] in self.index for mono, _ in constraint.terms) \
+            and self._maximum(constraint.terms) + constraint.const <= 0
+
+    def _maximum(self, terms):
+        # Größter Wert einer linearen Summe innerhalb der Schranken
+        total = 0
+        for (name,), coef in terms:
+            k = self.index[name]
+            total += coef * (self.upper[k] if coef > 0 else self.lower[k])
+        return total
+
+    def _propagate(self, slots, coefs, const):
+        # Aus sum(a * x) + c <= 0 folgt a_k * x_k <= -c - (kleinste Aktivität der übrigen Terme)
+        low = [coef * (self.lower[k] if coef > 0 else self.upper[k]) for k, coef in zip(slots, coefs)]
+        infinite = sum(1 for value in low if value == -inf)
+        finite = sum(value for value in low if value != -inf)
+        if infinite == 0 and finite + const > 0:
+            return None
+        changed = []
+        for k, coef, value in zip(slots, coefs, low):
+            if infinite > 1 or (infinite == 1 and value != -inf):
+                continue
+            residual = finite - (value if value != -inf else 0)
+            bound = (-const - residual) / coef
+            if coef > 0 and floor(bound) < self.upper[k]:
+                self.upper[k] = floor(bound)
+                changed.append(k)
+            elif coef < 0 and ceil(bound) > self.lower[k]:
+                self.lower[k] = ceil(bound)
+                changed.append(k)
+            if self.lower[k] > self.upper[k]:
+                return None
+        return changed
+
+    def to_z3(self, cells):  # Schranken und verbliebene Bedingungen als z3-Ausdrücke
+        if self.infeasible:
+            return [z3.BoolVal(False)]
+        result = []
+        for name, lower, upper in zip(self.names, self.lower, self.upper):
+            if lower == upper:
+                result.append(cells[name] == int(lower))
+                continue
+            if lower != -inf:
+                result.append(cells[name] >= int(lower))
+            if upper != inf:
+                result.append(cells[name] <= int(upper))
+        return result + [constraint.to_z3(cells) for constraint in self.constraints]
@@ -0,0 +1,126 @@
+from decompose import UnionFind
+from grounding import Constraint, ConstraintStore, Disjunction, Poly
+
+
+class Reduction:  # Faltet erzwungene Gleichheiten: gleiche Zellen teilen sich einen Vertreter, festgelegte Zellen werden Konstanten
+    """
+    >>> from grounding import Grid
+    >>> grid = Grid(4, 4, Poly.var)
+    >>> store = ConstraintStore()
+    >>> for i in range(1, 5):
+    ...     for j in range(1, 5):
+    ...         _ = store.add(grid.cell(i, j) == grid.cell(j, i))
+    ...         _ = store.add(grid.cell(i, j) >= i)
+    >>> _ = store.add(grid.cell(2, 2) == 3)
+    >>> reduced = Reduction(store, grid.names)
+    >>> len(reduced.names), reduced.weights['A_1_2'], reduced.offset
+    (9, 2, 3)
+    >>> len(reduced.store), reduced.expand({name: 0 for name in reduced.names})['A_2_2']
+    (15, 3)
+    >>> store = ConstraintStore()
+    >>> for constraint in (grid.cell(1, 2) == grid.cell(2, 1), grid.cell(1, 2) == 1, grid.cell(2, 1) + grid.cell(1, 1) == 4,
+    ...                    grid.cell(1, 1) == 2):
+    ...     _ = store.add(constraint)
+    >>> Reduction(store, grid.names).infeasible
+    True
+    >>> store = ConstraintStore()
+    >>> for constraint in (grid.cell(1, 1) == Poly.var('U_1'), Poly.var('U_1') == grid.cell(1, 2), Poly.var('U_2') >= 0):
+    ...     _ = store.add(constraint)
+    >>> reduced = Reduction(store, grid.names + ['U_1', 'U_2'], ['U_1', 'U_2'])
+    >>> reduced.weights['A_1_1'], reduced.weights['U_2']
+    (2, 0)
+    """
+
+    def __init__(self, store, names, auxiliary=()):  # auxiliary: Namen von Hilfsvariablen, die nicht zur Zielfunktion zählen
+        self.original = list(names)
+        self.index = {name: k for k, name in enumerate(self.original)}
+        self.sets = UnionFind(len(self.original))
+        self.pinned = {}  # Vertreter -> Wert der ganzen Klasse
+        self.infeasible = store.infeasible
+        # Neue Gleichungen können erst nach dem Einsetzen sichtbar werden, z.B. x + y == 5 mit festem y
+        while not self.infeasible and self._collect(store):
+            store = self._substitute(store)
+        self.store = store
+        if self.infeasible:
+            self.store = ConstraintStore()
+            self.store.infeasible = True
+        roots = [k for k in range(len(self.original)) if self.sets.find(k) == k]
+        # Gewicht eines Vertreters: Zahl der Tabellenzellen in seiner Klasse, Hilfsvariablen zählen nicht mit
+        auxiliary = {self.index[name] for name in auxiliary}
+        cells = {}
+        for k in range(len(self.original)):
+            if k not in auxiliary:
+                root = self.sets.find(k)
+                cells[root] = cells.get(root, 0) + 1
+        self.names = [self.original[k] for k in roots if k not in self.pinned]
+        self.weights = {self.original[k]: cells.get(k, 0) for k in roots if k not in self.pinned}
+        self.offset = sum(value * cells.get(k, 0) for k, value in self.pinned.items())
+
+    def __repr__(self):
+        return f'Reduction({len(self.original)} cells -> {len(self.names)} unknowns)'
+
+    def _collect(self, store):
+        changed = False
+        for constraint in store:
+            if constraint.op != '==':
+                continue
+            terms = constraint.terms
+            if len(terms) == 1 and len(terms[0][0]) == 1:
+                # Nach der Normalisierung ist der Koeffizient einer einzelnen Variable 1
+                changed |= self._pin(self.index[terms[0][0][0]], -constraint.const)
+            elif len(terms) == 2 and constraint.const == 0 and all(len(mono) == 1 for mono, _ in terms) and \
+                    sorted(coef for _, coef in terms) == [-1, 1]:
+                changed |= self._merge(self.index[terms[0][0][0]], self.index[terms[1][0][0]])
+        return changed
+
+    def _pin(self, k, value):
+        k = self.sets.find(k)
+        if k in self.pinned:
+            self.infeasible |= self.pinned[k] != value
+            return False
+        self.pinned[k] = value
+        return True
+
+    def _merge(self, a, b):
+        a, b = self.sets.find(a), self.sets.find(b)
+        if a == b:
+            return False
+        values = [self.pinned.pop(k) for k in (a, b) if k in self.pinned]
+        self.sets.union(a, b)
+        if values:
+            self.infeasible |= len(set(values)) > 1
+            self.pinned[self.sets.find(a)] = values[0]
+        return True
+
+    def _term(self, name):
+        k = self.sets.find(self.index[name])
+        return self.pinned[k] if k in self.pinned else Poly.var(self.original[k])
+
+    def _substitute(self, store):
+        reduced = ConstraintStore()
+        for constraint in store:
+            if all(self.sets.find(self.index[name]) == self.index[name] and self.index[name] not in self.pinned
+                   for name in constraint.variables()):
+                reduced.add(constraint)
+                continue
+            reduced.add(self._rewrite(constraint))
+        self.infeasible |= reduced.infeasible
+        return reduced
+
+    def _rewrite(self, constraint):
+        if isinstance(constraint, Disjunction):
+            return Disjunction.make(*(self._rewrite(part) for part in constraint.parts))
+        poly = Poly.lift(constraint.const)
+        for mono, coef in constraint.terms:
+            term = Poly.lift(coef)
+            for name in mono:
+                term = term * self._term(name)
+            poly = poly + term
+        return Constraint.make(constraint.op, poly)
+
+    def expand(self, values):  # Werte der Vertreter -> Werte aller ursprünglichen Zellen
+        result = {}
+        for k, name in enumerate(self.original):
+            root = self.sets.find(k)
+            result[name] = self.pinned[root] if root in self.pinned else values[self.original[root]]
+        return result
@@ -0,0 +1,116 @@
+from math import isqrt
+
+from grounding import Poly, bindings, children, references, variables
+from myparser import Bigger, BiggerEqual, Con, Equal, Or, Parenthesis, Smaller, SmallerEqual, Times
+
+MIRROR = {Smaller: Bigger, Bigger: Smaller, SmallerEqual: BiggerEqual, BiggerEqual: SmallerEqual, Equal: Equal}
+
+
+def _strip(node):
+    while isinstance(node, Parenthesis):
+        node = node.x
+    return node
+
+
+def _square(node):  # Basis E, falls node die Form E*E hat, sonst None
+    node = _strip(node)
+    if isinstance(node, Times) and repr(_strip(node.x)) == repr(_strip(node.y)):
+        return _strip(node.x)
+    return None
+
+
+def linearize(condition):  # Schreibt E*E op c in gleichwertige lineare Bedingungen um, liefert eine Liste von Bedingungen
+    """
+    >>> from myparser import CompiledCondition
+    >>> parse = lambda line: CompiledCondition.parse(line)[0][0]
+    >>> linearize(parse("(A[i][j] - A[i+1][j])*(A[i][j] - A[i+1][j]) >= 1;"))
+    [Or(BiggerEqual(Sub(Matrix(Var(i), Var(j)), Matrix(Plus(Var(i), Con(1)), Var(j))), Con(1)), SmallerEqual(Sub(Matrix(Var(i), Var(j)), Matrix(Plus(Var(i), Con(1)), Var(j))), Con(-1)))]
+    >>> linearize(parse("10 > A[i][j] * A[i][j];"))
+    [SmallerEqual(Matrix(Var(i), Var(j)), Con(3)), BiggerEqual(Matrix(Var(i), Var(j)), Con(-3))]
+    >>> linearize(parse("A[i][j] * A[i][j] >= 0;")), linearize(parse("A[1][1] * A[1][2] >= 4;"))
+    ([], [BiggerEqual(Times(Matrix(Con(1), Con(1)), Matrix(Con(1), Con(2))), Con(4))])
+    """
+    kind, left, right = type(condition), condition.x, condition.y
+    if kind not in MIRROR:
+        return [condition]
+    if _square(left) is None:
+        kind, left, right = MIRROR[kind], right, left
+    base, bound = _square(left), _strip(right)
+    # Produkte zweier verschiedener Terme bleiben nichtlinear
+    if base is None or not isinstance(bound, Con):
+        return [condition]
+    c = bound.con
+    # Über den ganzen Zahlen: E*E > c <=> E*E >= c + 1, E*E < c <=> E*E <= c - 1
+    if kind is Bigger:
+        kind, c = BiggerEqual, c + 1
+    elif kind is Smaller:
+        kind, c = SmallerEqual, c - 1
+    if kind is BiggerEqual:
+        if c <= 0:
+            return []
+        # E*E >= c <=> |E| >= ceil(sqrt(c))
+        r = isqrt(c - 1) + 1
+        return [Or(BiggerEqual(base, Con(r)), SmallerEqual(base, Con(-r)))]
+    if kind is SmallerEqual and c >= 0:
+        # E*E <= c <=> -floor(sqrt(c)) <= E <= floor(sqrt(c))
+        r = isqrt(c)
+        return [SmallerEqual(base, Con(r)), BiggerEqual(base, Con(-r))]
+    if kind is Equal and c >= 0 and isqrt(c) ** 2 == c:
+        r = isqrt(c)
+        return [Equal(base, Con(r))] if r == 0 else [Or(Equal(base, Con(r)), Equal(base, Con(-r)))]
+    # Unerfüllbare Fälle (E*E <= -1, E*E = 2, ...) bleiben stehen, der Solver erkennt sie
+    return [condition]
+
+
+class Aux:  # Hilfsvariable aus compress(), gehört nicht zur Tabelle und nicht zur Zielfunktion
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f'Aux({self.name})'
+
+    def compile(self):
+        term = Poly.var(self.name)
+        return lambda cell, env: term
+
+
+# L < R für alle Belegungen <=> max L < min R <=> es gibt u mit L <= u und u < R; entsprechend für die übrigen
+SPLIT = {Smaller: SmallerEqual, SmallerEqual: SmallerEqual, Bigger: BiggerEqual, BiggerEqual: BiggerEqual, Equal: Equal}
+
+
+def compress(condition, names, m, n):  # Vergleich zweier Seiten mit getrennten Indexvariablen -> zwei Bedingungen über eine Hilfsvariable
+    """
+    >>> from myparser import CompiledCondition
+    >>> parse = lambda line: CompiledCondition.parse(line)[0][0]
+    >>> names = ['A_1_1', 'A_1_2', 'A_2_1', 'A_2_2']
+    >>> compress(parse("A[1][i] < A[2][j];"), names, 2, 2), names[-1]
+    ([SmallerEqual(Matrix(Con(1), Var(i)), Aux(U_5)), Smaller(Aux(U_5), Matrix(Con(2), Var(j)))], 'U_5')
+    >>> compress(parse("A[i][j] >= A[j][i];"), names, 2, 2), compress(parse("A[1][i] < 3;"), names, 2, 2), len(names)
+    ([BiggerEqual(Matrix(Var(i), Var(j)), Matrix(Var(j), Var(i)))], [Smaller(Matrix(Con(1), Var(i)), Con(3))], 5)
+    >>> compress(parse("A[1][i] = A[2][j];"), ['A_1_1', 'A_1_2', 'A_1_3'], 1, 3)
+    []
+    """
+    # names erhält den Namen der neuen Hilfsvariable, damit das Grounding sie wie eine Zelle behandeln kann
+    kind = type(condition)
+    if kind not in SPLIT:
+        return [condition]
+    left, right = variables(condition.x), variables(condition.y)
+    # Nur wenn jede Seite eigene Variablen hat, die sie selbst durch Tabellenindizes begrenzt
+    if not left or not right or left & right or not all(_bounded(side) for side in (condition.x, condition.y)):
+        return [condition]
+    # Hat eine Seite keine gültige Belegung, gilt die Bedingung ohne jede Instanz; u würde sie sonst erzwingen
+    if any(next(bindings(side, m, n), None) is None for side in (condition.x, condition.y)):
+        return []
+    aux = Aux(f'U_{len(names) + 1}')
+    names.append(aux.name)
+    return [SPLIT[kind](condition.x, aux), kind(aux, condition.y)]
+
+
+def _bounded(side):
+    return variables(side) <= variables(*(expr for ref in references(side) for expr in (ref.x, ref.y)))
+
+
+def auxiliaries(node):  # Alle Hilfsvariablen eines AST
+    if isinstance(node, Aux):
+        return [node]
+    return [aux for child in children(node) for aux in auxiliaries(child)]
@@ -0,0 +1,79 @@
+import z3
+
+import grounding
+import myparser
+import rewrite
+
+
+class TableSession:  # Hält einen Optimizer über mehrere Änderungen der Bedingungen hinweg am Leben
+    """
+    >>> session = TableSession('tbldsc2.txt')
+    >>> session.solve()
+    [[0, 0, 0], [2, 2, 2]]
+    >>> pinned = session.add("A[2][2] = 3;")
+    >>> session.solve()
+    [[0, -1, 0], [2, 3, 2]]
+    >>> session.remove(pinned)
+    >>> session.replace(0, "A[i][j] <= 1;")
+    5
+    >>> session.solve()
+    No solution found!
+    []
+    """
+
+    def __init__(self, spec, timeout=120000):
+        if isinstance(spec, str):
+            spec = myparser.load_spec(spec)
+        self.m, self.n = spec.dimension.first, spec.dimension.second
+        self.grid = grounding.Grid(self.m, self.n)
+        self.names = grounding.Grid(self.m, self.n, grounding.Poly.var)
+        self.cells = dict(zip(self.grid.names, self.grid.cells))
+        self.opt = z3.Optimize()
+        self.opt.set(timeout=timeout)
+        self.opt.minimize(z3.Sum(self.grid.cells))
+        self.conditions = {}  # Handle -> AST der aktiven Bedingung
+        self.literals = {}  # Handle -> Schaltliteral, unter dem die Grundbedingungen stehen
+        self.count = 0
+        for condition in spec.conditions:
+            self.add(condition)
+
+    def add(self, condition):  # Nimmt eine Bedingung (Text oder AST) auf und liefert ihr Handle
+        if isinstance(condition, str):
+            parsed = myparser.CompiledCondition.parse(condition if condition.rstrip().endswith(';') else condition + ';')
+            if not parsed or parsed[0][1]:
+                raise ValueError(f'ungültige Bedingung {condition!r}')
+            condition = parsed[0][0]
+        handle = self.count
+        self.count += 1
+        # Nur die neue Bedingung wird gegroundet, ihre Instanzen gelten nur, solange ihr Literal angenommen wird
+        literal = z3.Bool(f'condition_{handle}')
+        store = grounding.ConstraintStore()
+        for part in rewrite.linearize(condition):
+            function = part.compile()
+            for env in grounding.bindings(part, self.m, self.n):
+                store.add(function(self.names.cell, env))
+        self.opt.add([z3.Implies(literal, constraint) for constraint in store.to_z3(self.cells)])
+        self.conditions[handle] = condition
+        self.literals[handle] = literal
+        return handle
+
+    def remove(self, handle):
+        # Das Literal wird endgültig abgeschaltet, damit der Solver die Instanzen nicht mehr berücksichtigen muss
+        self.opt.add(z3.Not(self.literals.pop(handle)))
+        del self.conditions[handle]
+
+    def replace(self, handle, condition):
+        self.remove(handle)
+        return self.add(condition)
+
+    def solve(self):
+        if self.opt.check(*self.literals.values()) != z3.sat:
+            print("No solution found!")
+            return []
+        model = self.opt.model()
+        table = [[model.evaluate(cell, model_completion=True).as_long() for cell in row] for row in self.grid.rows()]
+        # Das letzte Optimum dient als Startwert für die nächste Suche
+        if hasattr(self.opt, 'set_initial_value'):
+            for cell, value in zip(self.grid.cells, (value for row in table for value in row)):
+                self.opt.set_initial_value(cell, value)
+        return table
@@ -0,0 +1,219 @@
+from grounding import Constraint, Disjunction, Poly, domains, references
+from myparser import Bigger, BiggerEqual, Con, Equal, Matrix, Or, Parenthesis, Plus, Smaller, SmallerEqual, Sub, Times, Var
+from rewrite import Aux, auxiliaries
+
+try:
+    import numpy as np
+except ImportError:  # ohne NumPy gründet main._ground_flat mit grounding.bindings
+    np = None
+
+OPERATORS = {Smaller: '<', Bigger: '>', SmallerEqual: '<=', BiggerEqual: '>=', Equal: '=='}
+LARGEST = 1 << 31  # Größere Konstanten könnten in int64 überlaufen, die Bedingung wird dann Zeile für Zeile gegroundet
+
+
+def instances(condition, m, n, names):  # Alle Grundinstanzen einer Bedingung, in derselben Reihenfolge wie grounding.bindings
+    """
+    >>> from grounding import Grid, bindings
+    >>> from myparser import CompiledCondition
+    >>> parse = lambda line: CompiledCondition.parse(line)[0][0]
+    >>> grid = Grid(3, 4, Poly.var)
+    >>> for line in ("A[i][j] - A[i+1][j] >= i;", "A[i][j] * A[j][i] = 2 * A[i][j];", "A[i][j] <= A[i][j+k];",
+    ...              "A[2][2] = 3;", "A[4][1] = 3;"):
+    ...     condition = parse(line)
+    ...     function = condition.compile()
+    ...     expected = [function(grid.cell, env) for env in bindings(condition, 3, 4)]
+    ...     print(len(expected), list(instances(condition, 3, 4, grid.names)) == expected)
+    8 True
+    9 True
+    18 True
+    1 True
+    0 True
+    >>> list(instances(parse("2 * A[i][1] > 4 * A[1][i];"), 2, 2, Grid(2, 2, Poly.var).names))
+    [A_1_1 <= -1, 2*A_1_2 - A_2_1 <= -1]
+    >>> list(instances(parse("A[i][i+k] < A[i][i+k+1];"), 2, 1, Grid(2, 1, Poly.var).names))
+    []
+    """
+    return iter(ground(condition, *arrays(condition, m, n), names))
+
+
+def arrays(condition, m, n):  # (Variablenwerte, Zellindex jeder Referenz, Anzahl) aller gültigen Belegungen als 1-D-Arrays
+    variables, _, limits = domains(condition, m, n)
+    refs = references(condition)
+    # Eine Obergrenze <= 0 (z.B. k in A[i][i+k] bei n = 1) heißt wie in grounding.bindings: keine Belegung
+    if any(limits[name] <= 0 for name in variables):
+        empty = np.zeros(0, dtype=np.int64)
+        return {name: empty for name in variables}, {id(ref): empty for ref in refs}, 0
+    # Jede Variable bekommt eine eigene Achse, so laufen alle Belegungen gleichzeitig durch
+    shape = tuple(limits[name] for name in variables)
+    axes = {name: np.arange(1, limits[name] + 1).reshape([-1 if k == d else 1 for k in range(len(shape))])
+            for d, name in enumerate(variables)}
+    coordinates = [(_index(ref.x, axes), _index(ref.y, axes)) for ref in refs]
+    valid = np.ones(shape, dtype=bool)
+    for i, j in coordinates:
+        valid &= (1 <= i) & (i <= m) & (1 <= j) & (j <= n)
+    rows = np.flatnonzero(valid)
+    # Ab hier sind alle Arrays eindimensional, eine Stelle pro gültiger Belegung
+    axes = {name: np.broadcast_to(axis, shape).reshape(-1)[rows] for name, axis in axes.items()}
+    flats = {id(ref): np.broadcast_to((i - 1) * n + (j - 1), shape).reshape(-1)[rows]
+             for ref, (i, j) in zip(refs, coordinates)}
+    return axes, flats, len(rows)
+
+
+def ground(condition, axes, flats, count, names):  # Grundinstanzen zu den Belegungen aus arrays(), als Liste
+    if not count:
+        return []
+    # Hilfsvariablen (rewrite.Aux) sind wie Zellen Spalten, nur mit derselben Variable in jeder Zeile
+    flats = dict(flats)
+    for node in auxiliaries(condition):
+        flats[id(node)] = np.full(count, names.index(node.name))
+    ranks = np.empty(len(names), dtype=np.int64)
+    ranks[np.argsort(np.array(names))] = np.arange(len(names))
+    try:
+        return _ground(condition, axes, flats, count, names, ranks)
+    except OverflowError:
+        return _slow(condition, axes, flats, range(count), names)
+
+
+def evaluate(expr, axes, flats, values):  # Wert eines Ausdrucks bei den Zellwerten values (Array in Zeilenreihenfolge)
+    if isinstance(expr, Con):
+        return expr.con
+    if isinstance(expr, Var):
+        return axes[expr.var]
+    if isinstance(expr, Matrix):
+        return values[flats[id(expr)]]
+    if isinstance(expr, Parenthesis):
+        return evaluate(expr.x, axes, flats, values)
+    x, y = evaluate(expr.x, axes, flats, values), evaluate(expr.y, axes, flats, values)
+    return {Plus: np.add, Sub: np.subtract, Times: np.multiply, Or: np.logical_or, Smaller: np.less,
+            Bigger: np.greater, SmallerEqual: np.less_equal, BiggerEqual: np.greater_equal,
+            Equal: np.equal}[type(expr)](x, y)
+
+
+def _index(expr, axes):  # Indexausdruck (Plus/Times über Con/Var) als Array über alle Belegungen
+    if isinstance(expr, Con):
+        return expr.con
+    if isinstance(expr, Var):
+        return axes[expr.var]
+    if isinstance(expr, Parenthesis):
+        return _index(expr.x, axes)
+    x, y = _index(expr.x, axes), _index(expr.y, axes)
+    if isinstance(expr, Plus):
+        return x + y
+    if isinstance(expr, Sub):
+        return x - y
+    if isinstance(expr, Times):
+        return x * y
+    raise ValueError(f'{expr} ist kein Indexausdruck')
+
+
+def _expand(expr, axes, flats):  # Wert einer Seite als {Tupel von Referenzen: Koeffizient als Zahl oder Array}
+    if isinstance(expr, Con):
+        if abs(expr.con) >= LARGEST:
+            raise OverflowError(expr.con)
+        return {(): expr.con}
+    if isinstance(expr, Var):
+        return {(): axes[expr.var]}
+    if isinstance(expr, (Matrix, Aux)):
+        return {(id(expr),): 1}
+    if isinstance(expr, Parenthesis):
+        return _expand(expr.x, axes, flats)
+    x, y = _expand(expr.x, axes, flats), _expand(expr.y, axes, flats)
+    if isinstance(expr, Plus):
+        return _combine(x, y, 1)
+    if isinstance(expr, Sub):
+        return _combine(x, y, -1)
+    if isinstance(expr, Times):
+        product = {}
+        for mono1, coef1 in x.items():
+            for mono2, coef2 in y.items():
+                product = _combine(product, {mono1 + mono2: coef1 * coef2}, 1)
+        return product
+    raise ValueError(f'{expr} ist kein Wertausdruck')
+
+
+def _combine(x, y, sign):
+    result = dict(x)
+    for mono, coef in y.items():
+        result[mono] = result.get(mono, 0) + sign * coef
+    return result
+
+
+def _ground(condition, axes, flats, count, names, ranks):  # Liste der Grundinstanzen aller count Belegungen
+    if isinstance(condition, Or):
+        return [Disjunction.make(x, y) for x, y in zip(_ground(condition.x, axes, flats, count, names, ranks),
+                                                       _ground(condition.y, axes, flats, count, names, ranks))]
+    if type(condition) not in OPERATORS:
+        return _slow(condition, axes, flats, range(count), names)
+    op = OPERATORS[type(condition)]
+    poly = _combine(_expand(condition.x, axes, flats), _expand(condition.y, axes, flats), -1)
+    const = np.broadcast_to(np.asarray(poly.pop((), 0), dtype=np.int64), (count,))
+    monos = list(poly)
+    if not monos or any(len(mono) != 1 for mono in monos):
+        return _slow(condition, axes, flats, range(count), names)
+
+    # Lineare Bedingung: Spalten sind die Referenzen, Zeilen die Belegungen
+    flat = np.stack([flats[mono[0]] for mono in monos], axis=1)
+    coef = np.stack([np.broadcast_to(np.asarray(poly[mono], dtype=np.int64), (count,)) for mono in monos], axis=1)
+    if np.abs(coef).max() >= LARGEST or np.abs(const).max() >= LARGEST:
+        raise OverflowError(condition)
+    # Wie Constraint.make: p > 0 und p >= 0 werden zu -p < 0 und -p <= 0, p < 0 zu p + 1 <= 0
+    if op in ('>', '>='):
+        coef, const = -coef, -const
+    const = const + (1 if op in ('<', '>') else 0)
+    op = '==' if op == '==' else '<='
+    # Die Terme werden wie in Constraint.make nach dem Zellnamen sortiert
+    order = np.argsort(ranks[flat], axis=1, kind='stable')
+    flat, coef = np.take_along_axis(flat, order, axis=1), np.take_along_axis(coef, order, axis=1)
+    # Zeilen, in denen eine Zelle doppelt vorkommt oder ein Koeffizient 0 ist, gehen den Weg über Poly
+    simple = (coef != 0).all(axis=1) & (flat[:, 1:] != flat[:, :-1]).all(axis=1)
+    divisor = np.gcd.reduce(np.abs(coef), axis=1)
+    divisor[~simple] = 1
+    if op == '==':
+        feasible = const % divisor == 0
+        divisor = np.where(coef[:, 0] < 0, -divisor, divisor)
+        const = const // divisor
+    else:
+        feasible = np.ones(count, dtype=bool)
+        const = -(-const // divisor)
+    coef = coef // divisor[:, None]
+
+    monos = [(name,) for name in names]
+    result = [Constraint(op, tuple(zip([monos[cell] for cell in cells], coefs)), c)
+              for cells, coefs, c in zip(flat.tolist(), coef.tolist(), const.tolist())]
+    # Nur die wenigen Sonderzeilen werden danach ersetzt
+    for row in np.flatnonzero(~feasible).tolist():
+        result[row] = False
+    hard = np.flatnonzero(~simple).tolist()
+    for row, constraint in zip(hard, _slow(condition, axes, flats, hard, names)):
+        result[row] = constraint
+    return result
+
+
+def _slow(condition, axes, flats, rows, names):  # Dieselben Instanzen über Poly, für Sonderfälle und Nichtlineares
+    # Die Zellen kommen weiterhin aus den Arrays, nur die Bedingung selbst wird pro Belegung ausgewertet
+    rows = list(rows)
+    cells = {key: flat[rows].tolist() for key, flat in flats.items()}
+    values = {name: axis[rows].tolist() for name, axis in axes.items()}
+    # Wie Node.compile(), aber cell bekommt den Matrix-Knoten selbst, seine Zelle steht schon in den Arrays
+    function = _compile(condition)
+    result = []
+    for row in range(len(rows)):
+        env = {name: value[row] for name, value in values.items()}
+        result.append(function(lambda ref: Poly.var(names[cells[id(ref)][row]]), env))
+    return result
+
+
+def _compile(node):
+    if isinstance(node, (Matrix, Aux)):
+        return lambda cell, env: cell(node)
+    if isinstance(node, Con):
+        return lambda cell, env: node.con
+    if isinstance(node, Var):
+        return lambda cell, env: env[node.var]
+    if isinstance(node, Parenthesis):
+        return _compile(node.x)
+    x, y = _compile(node.x), _compile(node.y)
+    operation = {Plus: lambda a, b: a + b, Sub: lambda a, b: a - b, Times: lambda a, b: a * b, Or: lambda a, b: a | b,
+                 Smaller: lambda a, b: a < b, Bigger: lambda a, b: a > b, SmallerEqual: lambda a, b: a <= b,
+                 BiggerEqual: lambda a, b: a >= b, Equal: lambda a, b: a == b}[type(node)]
+    return lambda cell, env: operation(x(cell, env), y(cell, env))